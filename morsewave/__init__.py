@@ -0,0 +1,50 @@
+# Morse Wave Translator decoder engine.
+# This package holds the signal processing and decoding code shared by the graphical front-ends.
+# It has no GUI or audio device dependencies, and the names below are imported from their submodules
+# the first time they are used, so that importing the package does not load NumPy or any backend.
+import importlib
+
+# Public names and the submodules they are defined in.
+_EXPORTS = {
+    'AudioBuffer': 'buffer',
+    'DecodeCache': 'cache',
+    'iter_decode_file_cached': 'cache',
+    'Channelizer': 'channelizer',
+    'DECODE_TABLE': 'codes',
+    'MORSE_CODE_DICT': 'codes',
+    'EnvelopeDecoder': 'decoder',
+    'StreamingMorseDecoder': 'decoder',
+    'decode_samples': 'decoder',
+    'iter_decode_samples': 'decoder',
+    'MorseDecoder': 'engine',
+    'file_digest': 'files',
+    'iter_decode_file': 'files',
+    'iter_decode_file_channels': 'files',
+    'LiveMorseDecoder': 'live',
+    'DecodeMetrics': 'metrics',
+    'RingBuffer': 'ringbuffer',
+    'soft_decode_samples': 'soft',
+    'train_bigrams': 'soft',
+    'encode_to_audio': 'synth',
+    'encode_to_file': 'synth',
+    'iter_encode': 'synth',
+    'TimingModel': 'timing',
+    'ToneDetector': 'tone',
+    'find_pitch': 'tone',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    # Import the submodule defining a public name on first access, and keep the name in the package.
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,6 @@
+# Run the command line interface with "python -m morsewave".
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,270 @@
+# Graphical front-end shared by the English and Italian versions of Morse Wave Translator.
+# The window only differs between languages by its string catalog, chosen once at startup, so every
+# fix to the window or the engine behind it applies to both front-ends.
+# Import the sys module for accessing command line arguments.
+import sys
+# Import the PyQt5 module for creating a graphical interface.
+import PyQt5.QtWidgets as QtWidgets
+# Import the Qt core and GUI modules for the thread pool and the text cursor.
+import PyQt5.QtCore as QtCore
+import PyQt5.QtGui as QtGui
+
+# Import the decoder engine. Its decoding stages and audio backends (sounddevice, soundfile and pygame)
+# are only imported when they are first used, so the window opens without waiting for them.
+from .engine import MorseDecoder
+from .strings import DEFAULT_LANGUAGE, get_catalog, select_language
+# Import the live envelope and waterfall panel shown while recording.
+from .scopewidget import ScopeWidget
+# Import the background worker, which runs recording and decoding off the GUI thread.
+from .workers import Worker
+
+
+class MorseDecoderApp(QtWidgets.QWidget):
+    def __init__(self, language=DEFAULT_LANGUAGE):
+        # Constructor for the MorseDecoderApp class.
+        super(MorseDecoderApp, self).__init__()
+        # String catalog of the language the window is shown in.
+        self.strings = get_catalog(language)
+        # Initialize the list of input devices available.
+        self.input_devices = self.get_input_devices()  # Initialize the list of input devices
+        # Initialize the user interface (UI) for the application.
+        self.init_ui()
+        # Create an instance of the MorseDecoder class for Morse code processing.
+        self.morse_decoder = MorseDecoder()
+        # Keep decoded files in the decode cache, so that opening an archive recording again is instant.
+        self.morse_decoder.use_cache = True
+        # Thread pool running the recording and decoding jobs, and the last job started.
+        self.thread_pool = QtCore.QThreadPool.globalInstance()
+        self.worker = None
+
+    def init_ui(self):
+        # Initialize the user interface (UI) elements of the application.
+        strings = self.strings
+        # Set the title of the application window.
+        self.setWindowTitle(strings['window_title'])
+        # Set the initial position and size of the application window.
+        self.setGeometry(100, 100, 600, 300)
+        # Create a QPushButton widget with the label "Record."
+        self.record_button = QtWidgets.QPushButton(strings['record'])
+        # Set an icon for the "Record" button, using the standard media play icon from the QApplication style.
+        self.record_button.setIcon(QtWidgets.QApplication.style().standardIcon(QtWidgets.QStyle.SP_MediaPlay))
+        # Connect the "clicked" signal of the "Record" button to the "record_audio" method.
+        self.record_button.clicked.connect(self.record_audio)
+
+        self.decode_button = QtWidgets.QPushButton(strings['decode'])
+        self.decode_button.setIcon(QtWidgets.QApplication.style().standardIcon(QtWidgets.QStyle.SP_MediaSeekForward))
+        self.decode_button.clicked.connect(self.decode_audio)
+
+        self.open_file_button = QtWidgets.QPushButton(strings['open_file'])
+        self.open_file_button.setIcon(QtWidgets.QApplication.style().standardIcon(QtWidgets.QStyle.SP_DirOpenIcon))
+        self.open_file_button.clicked.connect(self.open_audio_file)
+
+        self.duration_input = QtWidgets.QLineEdit(self)
+        self.duration_input.setPlaceholderText(strings['duration_placeholder'])
+
+        self.input_device_label = QtWidgets.QLabel(strings['input_device'])
+        self.input_device_combo = QtWidgets.QComboBox(self)
+        self.input_device_combo.addItems(self.input_devices)  # Set the list of input devices
+
+        self.duration_label = QtWidgets.QLabel(strings['duration'])
+        self.text_output_label = QtWidgets.QLabel(strings['results'])
+
+        self.text_output = QtWidgets.QTextEdit()
+        self.text_output.setReadOnly(True)
+
+        self.help_button = QtWidgets.QPushButton(strings['help'])
+        self.help_button.clicked.connect(self.show_help)
+
+        self.play_button = QtWidgets.QPushButton(strings['play'])
+        self.play_button.setIcon(QtWidgets.QApplication.style().standardIcon(QtWidgets.QStyle.SP_MediaPlay))
+        self.play_button.clicked.connect(self.play_recorded_audio)
+
+        self.save_button = QtWidgets.QPushButton(strings['save'])
+        self.save_button.setIcon(QtWidgets.QApplication.style().standardIcon(QtWidgets.QStyle.SP_DialogSaveButton))
+        self.save_button.clicked.connect(self.save_recorded_audio)
+
+        self.stop_button = QtWidgets.QPushButton(strings['stop'])
+        self.stop_button.setIcon(QtWidgets.QApplication.style().standardIcon(QtWidgets.QStyle.SP_MediaStop))
+        self.stop_button.setEnabled(False)
+        self.stop_button.clicked.connect(self.cancel_job)
+
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setRange(0, 100)
+
+        # Live envelope and waterfall of the input, so that the operator can see why a decode fails.
+        self.scope_view = ScopeWidget(self)
+
+        layout = QtWidgets.QVBoxLayout()
+        layout.addWidget(self.input_device_label)
+        layout.addWidget(self.input_device_combo)
+        layout.addWidget(self.duration_label)
+        layout.addWidget(self.duration_input)
+        layout.addWidget(self.record_button)
+        layout.addWidget(self.decode_button)
+        layout.addWidget(self.play_button)
+        layout.addWidget(self.save_button)
+        layout.addWidget(self.open_file_button)
+        layout.addWidget(self.stop_button)
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.scope_view)
+        layout.addWidget(self.text_output_label)
+        layout.addWidget(self.text_output)
+        layout.addWidget(self.help_button)
+
+        self.setLayout(layout)
+
+    def record_audio(self):
+        duration_str = self.duration_input.text()
+        try:
+            duration = float(duration_str)
+        except ValueError:
+            self.text_output.append(self.strings['invalid_duration'])
+            return
+
+        if duration <= 0:
+            self.text_output.append(self.strings['duration_not_positive'])
+            return
+
+        input_device_index = self.input_device_combo.currentIndex()
+        if self.morse_decoder.scope is None:
+            # The display buffers are created with the first recording, which loads NumPy anyway.
+            from .scope import ScopeBuffer
+            self.morse_decoder.scope = ScopeBuffer(self.morse_decoder.sample_rate)
+            self.scope_view.set_scope(self.morse_decoder.scope)
+        self.start_job(self.recording_finished, self.recording_failed,
+                       self.morse_decoder.record_audio, duration, input_device_index)
+
+    def recording_finished(self, recorded_duration):
+        self.text_output.clear()
+        self.text_output.append(self.strings['recorded'].format(seconds=recorded_duration))
+
+    def recording_failed(self, e):
+        # sounddevice is loaded by the recording, unless it could not be imported at all.
+        sd = sys.modules.get('sounddevice')
+        if sd is not None and isinstance(e, sd.PortAudioError):
+            self.text_output.append(self.strings['recording_error'].format(error=e))
+        else:
+            self.text_output.append(self.strings['recording_unknown_error'].format(error=e))
+
+    def decode_audio(self):
+        if self.morse_decoder.has_audio():
+            self.text_output.append(self.strings['decoded'])
+            self.start_job(self.decoding_finished, self.decoding_failed, self.decode_recording)
+        else:
+            self.text_output.append(self.strings['no_audio'])
+
+    def decode_recording(self, on_text=None, on_progress=None, cancelled=None):
+        # Decode the recorded float32 samples in place; run on the thread pool by decode_audio.
+        return self.morse_decoder.decode(self.morse_decoder.audio.samples, on_text=on_text, on_progress=on_progress,
+                                         cancelled=cancelled)
+
+    def decoding_finished(self, decoded_text):
+        # A Stop pressed after the last check of the job did not cut the text short.
+        if self.worker.stopped:
+            self.append_partial_text(self.strings['stopped'])
+
+    def decoding_failed(self, e):
+        self.text_output.append(self.strings['decoding_unknown_error'].format(error=e))
+
+    def open_audio_file(self):
+        options = QtWidgets.QFileDialog.Options()
+        file_name, _ = QtWidgets.QFileDialog.getOpenFileName(self, self.strings['open_title'], "",
+                                                            self.strings['audio_filter'], options=options)
+        if file_name:
+            self.text_output.append(self.strings['decoded_file'])
+            self.start_job(self.decoding_finished, self.file_decoding_failed,
+                           self.morse_decoder.decode_audio_file, file_name)
+
+    def file_decoding_failed(self, e):
+        # soundfile is loaded by the file decoder, unless it could not be imported at all.
+        # The decode cache reads the file itself before soundfile does, so a missing file is an OSError.
+        sf = sys.modules.get('soundfile')
+        if isinstance(e, OSError) or (sf is not None and isinstance(e, sf.SoundFileError)):
+            self.text_output.append(self.strings['file_error'].format(error=e))
+        else:
+            self.text_output.append(self.strings['file_unknown_error'].format(error=e))
+
+    def play_recorded_audio(self):
+        if self.morse_decoder.has_audio():
+            try:
+                self.morse_decoder.play_audio(self.morse_decoder.audio)
+            except Exception as e:
+                self.text_output.append(self.strings['playback_unknown_error'].format(error=e))
+        else:
+            self.text_output.append(self.strings['no_audio_playback'])
+
+    def save_recorded_audio(self):
+        # The recorded audio is only written to disk here, when the user asks for it.
+        if self.morse_decoder.has_audio():
+            file_name, _ = QtWidgets.QFileDialog.getSaveFileName(self, self.strings['save_title'], "",
+                                                                self.strings['audio_filter'])
+            if file_name:
+                try:
+                    self.morse_decoder.save_audio(file_name)
+                    self.text_output.append(self.strings['saved'].format(file_name=file_name))
+                except Exception as e:
+                    self.text_output.append(self.strings['save_error'].format(error=e))
+        else:
+            self.text_output.append(self.strings['no_audio_save'])
+
+    def start_job(self, on_finished, on_failed, function, *args):
+        # Run a recording or decoding job on the thread pool, so that the window stays responsive.
+        # Partial text goes to the results area and progress to the progress bar as the job runs.
+        self.worker = Worker(function, *args)
+        self.worker.signals.text.connect(self.append_partial_text)
+        self.worker.signals.progress.connect(self.progress_bar.setValue)
+        self.worker.signals.finished.connect(self.end_job)
+        self.worker.signals.failed.connect(self.end_job)
+        self.worker.signals.finished.connect(on_finished)
+        self.worker.signals.failed.connect(on_failed)
+        self.progress_bar.setValue(0)
+        self.set_busy(True)
+        self.thread_pool.start(self.worker)
+
+    def end_job(self, _result=None):
+        # Enable the buttons again once the job has ended.
+        self.set_busy(False)
+
+    def cancel_job(self):
+        # Ask the running job to stop; it ends at its next block of work.
+        if self.worker is not None:
+            self.worker.cancel()
+
+    def set_busy(self, busy):
+        # Only one job runs at a time: disable the buttons that start one while a job is running.
+        for button in (self.record_button, self.decode_button, self.play_button, self.save_button,
+                       self.open_file_button):
+            button.setEnabled(not busy)
+        self.stop_button.setEnabled(busy)
+
+    def append_partial_text(self, text):
+        # Add decoded text to the end of the results area, on the same line.
+        self.text_output.moveCursor(QtGui.QTextCursor.End)
+        self.text_output.insertPlainText(text)
+
+    def closeEvent(self, event):
+        # Stop the running job and wait for it before the window closes.
+        self.cancel_job()
+        self.thread_pool.waitForDone()
+        super().closeEvent(event)
+
+    def show_help(self):
+        QtWidgets.QMessageBox.information(self, self.strings['help_title'], self.strings['help_text'])
+
+    def get_input_devices(self):
+        import sounddevice as sd
+        input_devices = []
+        devices = sd.query_devices()
+        for i, device in enumerate(devices):
+            if 'input' in device['name'].lower():
+                input_devices.append(f"{i}: {device['name']}")
+        return input_devices
+
+
+def main(language=DEFAULT_LANGUAGE):
+    # Open the application window and run the Qt event loop until it is closed.
+    # language is the front-end's own language; the MORSEWAVE_LANGUAGE environment variable overrides it.
+    app = QtWidgets.QApplication(sys.argv)
+    window = MorseDecoderApp(select_language(language))
+    window.show()
+    return app.exec_()
@@ -0,0 +1,263 @@
+# Benchmark and accuracy suite for the decoder engine, run on synthetic CW signals.
+# No audio hardware or files are needed: every signal is generated in memory with a fixed seed,
+# so the results of two commits can be compared case by case.
+import datetime
+import itertools
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from .codes import ENCODE_TABLE
+from .decoder import decode_samples, iter_decode_samples
+from .files import FILE_BLOCK_SIZE
+from .soft import soft_decode_samples
+from .synth import DEFAULT_SAMPLE_RATE, RISE_TIME, tokenize
+
+# Text sent in every case: all letters and digits, and a typical call.
+BENCH_TEXT = 'THE QUICK BROWN FOX JUMPS OVER THE LAZY DOG 0123456789 CQ DE IK2ABC K'
+# Parameter grid of the default corpus. An SNR of None is a clean signal.
+BENCH_WPM = (15, 25, 40)
+BENCH_SNR = (None, 10, 0)
+BENCH_PITCH = (700,)
+BENCH_JITTER = (0.0, 0.1)
+BENCH_FADING = (0.0, 0.5)
+# Number of timed runs of each decode path; the fastest is reported.
+BENCH_REPEAT = 3
+# Bandwidth in Hz the SNR is measured in, that of a typical receiver passband.
+NOISE_BANDWIDTH = 2500
+# Rate in Hz of the slow fading (QSB) applied to the carrier.
+FADING_RATE = 0.2
+# Seconds of silence before and after the signal.
+LEAD_TIME = 0.5
+
+
+def keying_runs(text):
+    # Return the key states and nominal lengths, in dot units, of the runs that send a text.
+    states = []
+    units = []
+    for symbol in tokenize(text):
+        if symbol == ' ':
+            units[-1] = 7
+            continue
+        code = ENCODE_TABLE.get(symbol)
+        if code is None:
+            raise ValueError(f"Cannot encode {symbol!r} in Morse code.")
+        for element in code:
+            states += [1.0, 0.0]
+            units += [3 if element == '-' else 1, 1]
+        units[-1] = 3
+    return np.array(states[:-1]), np.array(units[:-1], dtype=np.float64)
+
+
+def synthesize_case(text, wpm, pitch, sample_rate=DEFAULT_SAMPLE_RATE, snr=None, jitter=0.0, fading=0.0, seed=0):
+    # Generate the CW signal of a text as float32 samples.
+    # jitter is the standard deviation of the length of every run, relative to its nominal length,
+    # as with a hand key; fading is the depth of a slow sinusoidal fading of the carrier between 0 and 1;
+    # snr is the carrier to noise ratio in dB within NOISE_BANDWIDTH.
+    rng = np.random.default_rng(seed)
+    states, units = keying_runs(text)
+    unit = sample_rate * 1.2 / wpm
+    lengths = units * unit * (1 + jitter * rng.standard_normal(units.size))
+    lengths = np.maximum(lengths, 0.3 * units * unit).round().astype(np.int64)
+    lead = int(sample_rate * LEAD_TIME)
+    key = np.concatenate((np.zeros(lead), np.repeat(states, lengths), np.zeros(lead)))
+    # Shape the key edges with two moving averages, which give smooth ramps of about RISE_TIME.
+    width = max(1, int(sample_rate * RISE_TIME / 2))
+    for _ in range(2):
+        cumulative = np.concatenate(([0.0], np.cumsum(key)))
+        key = (cumulative[width:] - cumulative[:-width]) / width
+    t = np.arange(key.size) / sample_rate
+    if fading:
+        key *= 1 - fading * 0.5 * (1 - np.cos(2 * np.pi * FADING_RATE * t + rng.uniform(0, 2 * np.pi)))
+    samples = 0.5 * key * np.sin(2 * np.pi * pitch * t + rng.uniform(0, 2 * np.pi))
+    if snr is not None:
+        # White noise spreads over the whole band, so scale its power to give the SNR within the passband.
+        noise_power = 0.5 ** 2 / 2 / 10 ** (snr / 10) * (sample_rate / 2) / NOISE_BANDWIDTH
+        samples += rng.normal(0, np.sqrt(noise_power), samples.size)
+    return samples.astype(np.float32)
+
+
+def decode_batch(samples, sample_rate):
+    # Decode a whole signal at once.
+    return decode_samples(samples, sample_rate)
+
+
+def decode_streaming(samples, sample_rate):
+    # Decode a signal in blocks, as a file is decoded.
+    return ''.join(iter_decode_samples(samples, sample_rate, FILE_BLOCK_SIZE))
+
+
+def decode_soft(samples, sample_rate):
+    # Decode a whole signal with the soft-decision beam search.
+    return soft_decode_samples(samples, sample_rate)
+
+
+# Decode paths measured in every case.
+DECODE_PATHS = {'batch': decode_batch, 'streaming': decode_streaming, 'soft': decode_soft}
+
+
+def normalize_text(text):
+    # Upper-case a text and reduce every run of whitespace to one space, as the decoder writes it.
+    return ' '.join(text.upper().split())
+
+
+def character_error_rate(reference, decoded):
+    # Return the edit distance between the texts divided by the length of the reference.
+    # The distance is computed a row at a time, vectorized over the decoded text except for insertions.
+    reference = normalize_text(reference)
+    decoded = normalize_text(decoded)
+    if not reference:
+        return float(bool(decoded))
+    target = np.array(list(decoded))
+    row = np.arange(target.size + 1)
+    for position, char in enumerate(reference, 1):
+        # Deletions and substitutions depend on the previous row only.
+        candidates = np.minimum(row[1:] + 1, row[:-1] + (target != char))
+        row = np.concatenate(([position], candidates))
+        # Insertions run along the row; a running minimum of row - index resolves them all at once.
+        offsets = np.arange(row.size)
+        row = np.minimum.accumulate(row - offsets) + offsets
+    return float(row[-1]) / len(reference)
+
+
+def peak_rss_mb():
+    # Return the peak resident set size of the process in MB, where the platform reports it.
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return round(peak / (1 << 20 if sys.platform == 'darwin' else 1 << 10), 1)
+
+
+def peak_traced_mb(decode, samples, sample_rate):
+    # Return the peak memory in MB allocated while decoding a signal once, as traced by tracemalloc.
+    # NumPy reports its array buffers to tracemalloc, so the peak covers the arrays of the decode path
+    # alone, unlike the RSS of the process. Tracing slows the decode down, so it runs apart from the timed runs.
+    tracemalloc.start()
+    try:
+        decode(samples, sample_rate)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return round(peak / (1 << 20), 2)
+
+
+def git_commit():
+    # Return the commit the package is checked out at, or None outside a git work tree.
+    try:
+        result = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def run_case(case, text=BENCH_TEXT, sample_rate=DEFAULT_SAMPLE_RATE, repeat=BENCH_REPEAT, paths=None):
+    # Generate the signal of one case and time every decode path on it, and measure its peak memory.
+    samples = synthesize_case(text, sample_rate=sample_rate, **case)
+    record = dict(case, duration=round(samples.size / sample_rate, 3), results={})
+    for name in paths or DECODE_PATHS:
+        decode = DECODE_PATHS[name]
+        best = None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            decoded = decode(samples, sample_rate)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        record['results'][name] = {
+            'seconds': round(best, 6),
+            'samples_per_second': round(samples.size / best) if best > 0 else None,
+            'realtime_factor': round(samples.size / sample_rate / best, 1) if best > 0 else None,
+            'cer': round(character_error_rate(text, decoded), 4),
+            'peak_mb': peak_traced_mb(decode, samples, sample_rate),
+            'text': decoded.strip(),
+        }
+    return record
+
+
+def build_cases(wpm=BENCH_WPM, snr=BENCH_SNR, pitch=BENCH_PITCH, jitter=BENCH_JITTER, fading=BENCH_FADING, seed=0):
+    # Return one case per combination of the parameters, each with its own reproducible seed.
+    return [{'wpm': w, 'pitch': p, 'snr': s, 'jitter': j, 'fading': f, 'seed': seed + index}
+            for index, (w, s, p, j, f) in enumerate(itertools.product(wpm, snr, pitch, jitter, fading))]
+
+
+def summarize(cases):
+    # Aggregate the results of every decode path over all the cases.
+    summary = {}
+    for name in cases[0]['results'] if cases else ():
+        results = [case['results'][name] for case in cases]
+        factors = [result['realtime_factor'] for result in results if result['realtime_factor']]
+        summary[name] = {
+            'mean_cer': round(float(np.mean([result['cer'] for result in results])), 4),
+            'exact': sum(result['cer'] == 0 for result in results),
+            'median_realtime_factor': round(float(np.median(factors)), 1) if factors else None,
+            'total_seconds': round(sum(result['seconds'] for result in results), 6),
+            'max_peak_mb': max(result['peak_mb'] for result in results),
+        }
+    return summary
+
+
+def run_benchmark(cases=None, text=BENCH_TEXT, sample_rate=DEFAULT_SAMPLE_RATE, repeat=BENCH_REPEAT, paths=None,
+                  progress=None):
+    # Run every case and return the results with enough context to compare them across commits.
+    # progress, when given, is called with each case record as soon as it is done.
+    cases = build_cases() if cases is None else cases
+    records = []
+    for case in cases:
+        records.append(run_case(case, text, sample_rate, repeat, paths))
+        if progress is not None:
+            progress(records[-1])
+    return {
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'sample_rate': sample_rate,
+        'text': text,
+        'repeat': repeat,
+        'peak_rss_mb': peak_rss_mb(),
+        'summary': summarize(records),
+        'cases': records,
+    }
+
+
+def _case_key(case):
+    return tuple(case[name] for name in ('wpm', 'pitch', 'snr', 'jitter', 'fading', 'seed'))
+
+
+def compare_results(baseline, current):
+    # Return report lines comparing the summaries of two benchmark runs, and listing the cases
+    # whose character error rate got worse.
+    lines = [f"Baseline {baseline.get('commit') or 'unknown'}, current {current.get('commit') or 'unknown'}"]
+    for name, summary in current['summary'].items():
+        old = baseline['summary'].get(name)
+        if old is None:
+            continue
+        speed = ''
+        if old['median_realtime_factor'] and summary['median_realtime_factor']:
+            speed = f", speed x{summary['median_realtime_factor'] / old['median_realtime_factor']:.2f}"
+        # Results written before memory was measured per decode path have no peak to compare.
+        memory = ''
+        if old.get('max_peak_mb') is not None:
+            memory = f", peak memory {old['max_peak_mb']} -> {summary['max_peak_mb']} MB"
+        lines.append(f"{name}: mean CER {old['mean_cer']:.4f} -> {summary['mean_cer']:.4f}, "
+                     f"median real-time factor {old['median_realtime_factor']} -> {summary['median_realtime_factor']}"
+                     f"{speed}{memory}")
+    old_cases = {_case_key(case): case for case in baseline['cases']}
+    for case in current['cases']:
+        old = old_cases.get(_case_key(case))
+        if old is None:
+            continue
+        for name, result in case['results'].items():
+            if name in old['results'] and result['cer'] > old['results'][name]['cer']:
+                lines.append(f"  worse {name} at {case['wpm']} WPM, SNR {case['snr']}, jitter {case['jitter']}, "
+                             f"fading {case['fading']}: CER {old['results'][name]['cer']} -> {result['cer']}")
+    return lines
@@ -0,0 +1,42 @@
+# In-memory audio shared by decoding, playback and saving.
+import numpy as np
+
+from .dsp import to_mono
+
+# Full scale of 16-bit PCM.
+PCM16_SCALE = 32767
+
+
+class AudioBuffer:
+    # Recorded or synthesized audio held as float32 samples, one row per frame.
+    # Decoding reads the samples directly and playback gets 16-bit PCM converted once and cached,
+    # so neither has to write the audio to a file and read it back.
+    def __init__(self, samples, sample_rate):
+        # float32 input is kept as it is, without a copy.
+        self.samples = np.asarray(samples, dtype=np.float32)
+        self.sample_rate = sample_rate
+        # 16-bit PCM versions of the audio, by number of channels.
+        self.pcm = {}
+
+    def __len__(self):
+        return len(self.samples)
+
+    @property
+    def duration(self):
+        # Length of the audio in seconds.
+        return len(self.samples) / self.sample_rate
+
+    def mono(self):
+        # Return the audio as a one-dimensional array; a view of the samples for single-channel audio.
+        return to_mono(self.samples)
+
+    def pcm16(self, channels=1):
+        # Return the audio as 16-bit PCM frames with the given number of identical channels,
+        # in the C-contiguous layout that audio APIs take as a raw buffer.
+        pcm = self.pcm.get(channels)
+        if pcm is None:
+            if 1 not in self.pcm:
+                self.pcm[1] = (np.clip(self.mono(), -1.0, 1.0) * PCM16_SCALE).astype(np.int16)
+            pcm = self.pcm[1] if channels == 1 else np.repeat(self.pcm[1][:, None], channels, axis=1)
+            self.pcm[channels] = pcm
+        return pcm
@@ -0,0 +1,263 @@
+# Persistent cache of decoded audio files, so that re-opening a recording does not decode it again.
+# Results are stored in an SQLite database, keyed by the content digest of the file and the decoder
+# parameters. Alongside the text, the cache keeps the envelope of the file, which depends on the pitch
+# only: decoding the same file with another threshold or speed replays the envelope through the
+# classification stages without reading or filtering the audio again.
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from .decoder import EnvelopeDecoder, StreamingMorseDecoder
+from .dsp import THRESHOLD_POSITION
+from .files import FILE_BLOCK_SIZE, file_digest, read_blocks
+from .tone import ToneDetector
+
+# Total size in bytes of the envelopes and texts kept before the least recently used entries are evicted.
+CACHE_MAX_BYTES = 256 << 20
+# Name of the cache database in the cache directory.
+CACHE_FILE_NAME = 'decode-cache.sqlite3'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT);
+CREATE TABLE IF NOT EXISTS envelopes (
+    digest TEXT, pitch_key TEXT, rate REAL, pitch REAL, duration REAL, blocks BLOB, envelope BLOB,
+    size INTEGER, used REAL, PRIMARY KEY (digest, pitch_key));
+CREATE TABLE IF NOT EXISTS results (
+    digest TEXT, pitch_key TEXT, threshold REAL, wpm_key TEXT, text TEXT, wpm REAL, pitch REAL, duration REAL,
+    size INTEGER, used REAL, PRIMARY KEY (digest, pitch_key, threshold, wpm_key));
+"""
+
+
+def default_cache_path():
+    # Return the path of the cache database in the user's cache directory.
+    directory = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(directory, 'morsewave', CACHE_FILE_NAME)
+
+
+def _key(value):
+    # Key of an optional parameter: "auto" when it is found from the signal, otherwise its value.
+    return 'auto' if value is None else repr(float(value))
+
+
+class DecodeCache:
+    # SQLite cache of envelopes and decoded texts with least recently used eviction.
+    # Every entry records when it was last used; once the envelopes and texts take more than max_bytes,
+    # the entries used longest ago are deleted. A connection belongs to the thread that opened it,
+    # so each decoding job opens the cache with "with DecodeCache(path) as cache:".
+    def __init__(self, path=None, max_bytes=CACHE_MAX_BYTES):
+        self.path = path or default_cache_path()
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        self.connection.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def digest(self, path):
+        # Return the content digest of a file, hashing it only when its size or modification time changed.
+        status = os.stat(path)
+        path = os.path.abspath(path)
+        row = self.connection.execute('SELECT size, mtime_ns, digest FROM files WHERE path = ?', (path,)).fetchone()
+        if row is not None and row[:2] == (status.st_size, status.st_mtime_ns):
+            return row[2]
+        digest = file_digest(path)
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)',
+                                    (path, status.st_size, status.st_mtime_ns, digest))
+        return digest
+
+    def get_result(self, digest, pitch=None, threshold=None, wpm=None):
+        # Return the cached decode of a file as a dictionary with its text, wpm, pitch and duration, or None.
+        key = (digest, _key(pitch), threshold or THRESHOLD_POSITION, _key(wpm))
+        row = self.connection.execute(
+            'SELECT text, wpm, pitch, duration FROM results '
+            'WHERE digest = ? AND pitch_key = ? AND threshold = ? AND wpm_key = ?', key).fetchone()
+        if row is None:
+            return None
+        with self.connection:
+            self.connection.execute('UPDATE results SET used = ? '
+                                    'WHERE digest = ? AND pitch_key = ? AND threshold = ? AND wpm_key = ?',
+                                    (time.time(),) + key)
+        return dict(zip(('text', 'wpm', 'pitch', 'duration'), row))
+
+    def put_result(self, digest, pitch, threshold, wpm, result):
+        # Store the decode of a file, a dictionary as returned by get_result().
+        text = result['text']
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                    (digest, _key(pitch), threshold or THRESHOLD_POSITION, _key(wpm), text,
+                                     result['wpm'], result['pitch'], result['duration'], len(text.encode('utf-8')),
+                                     time.time()))
+        self.evict()
+
+    def get_envelope(self, digest, pitch=None):
+        # Return the cached envelope of a file as a dictionary, or None.
+        # "envelope" holds the envelope values and "blocks" the number of values produced by each block
+        # of audio, so that the envelope can be fed to a decoder exactly as it was when first decoded.
+        key = (digest, _key(pitch))
+        row = self.connection.execute('SELECT rate, pitch, duration, blocks, envelope FROM envelopes '
+                                      'WHERE digest = ? AND pitch_key = ?', key).fetchone()
+        if row is None:
+            return None
+        with self.connection:
+            self.connection.execute('UPDATE envelopes SET used = ? WHERE digest = ? AND pitch_key = ?',
+                                    (time.time(),) + key)
+        rate, found_pitch, duration, blocks, envelope = row
+        return {'rate': rate, 'pitch': found_pitch, 'duration': duration,
+                'blocks': np.frombuffer(blocks, dtype=np.int64), 'envelope': np.frombuffer(envelope, dtype=np.float32)}
+
+    def put_envelope(self, digest, pitch, entry):
+        # Store the envelope of a file, a dictionary as returned by get_envelope().
+        blocks = np.asarray(entry['blocks'], dtype=np.int64).tobytes()
+        envelope = np.asarray(entry['envelope'], dtype=np.float32).tobytes()
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO envelopes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                    (digest, _key(pitch), entry['rate'], entry['pitch'], entry['duration'],
+                                     blocks, envelope, len(blocks) + len(envelope), time.time()))
+        self.evict()
+
+    def size(self):
+        # Return the bytes used by the cached envelopes and texts.
+        return self.connection.execute('SELECT (SELECT COALESCE(SUM(size), 0) FROM envelopes) + '
+                                       '(SELECT COALESCE(SUM(size), 0) FROM results)').fetchone()[0]
+
+    def evict(self):
+        # Delete the least recently used entries until the cache fits in max_bytes.
+        excess = self.size() - self.max_bytes
+        if excess <= 0:
+            return
+        rows = self.connection.execute(
+            "SELECT 'envelopes', rowid, size, used FROM envelopes UNION ALL "
+            "SELECT 'results', rowid, size, used FROM results ORDER BY used")
+        doomed = []
+        for table, rowid, size, _ in rows:
+            if excess <= 0:
+                break
+            doomed.append((table, rowid))
+            excess -= size
+        with self.connection:
+            for table, rowid in doomed:
+                self.connection.execute(f'DELETE FROM {table} WHERE rowid = ?', (rowid,))
+
+
+def iter_decode_file_cached(audio_file, cache, block_size=FILE_BLOCK_SIZE, pitch=None, threshold=None, wpm=None,
+                            stats=None, progress=None, metrics=None, cancelled=None):
+    # Decode an audio file like iter_decode_file(), going through a DecodeCache.
+    # A file decoded before with the same parameters yields its cached text at once. A file whose envelope
+    # is cached for the pitch is decoded from the envelope, which only runs the keying and classification
+    # stages. Otherwise the file is decoded block by block, and its envelope and text are cached; a decode
+    # that is stopped early, by closing the generator or once cancelled() is true after a block, caches nothing.
+    # The envelope runs at 1 kHz, whatever the audio sample rate, so it takes a small fraction of the memory
+    # of the audio; envelopes too large for the cache are not kept.
+    # The metrics are published after every block, as by StreamingMorseDecoder, and once for a cached text.
+    digest = cache.digest(audio_file)
+    result = cache.get_result(digest, pitch, threshold, wpm)
+    if result is None:
+        entry = cache.get_envelope(digest, pitch)
+        pieces = []
+        if entry is not None:
+            decoder = EnvelopeDecoder(entry['rate'], metrics, threshold, wpm)
+            ends = np.cumsum(entry['blocks'])
+            for index, end in enumerate(ends.tolist()):
+                text = decoder.feed(entry['envelope'][end - entry['blocks'][index]:end])
+                decoder.publish()
+                if progress is not None:
+                    progress((index + 1) / ends.size)
+                if text:
+                    pieces.append(text)
+                    yield text
+                if cancelled is not None and cancelled():
+                    return
+            text = decoder.flush()
+            decoder.publish()
+            if text:
+                pieces.append(text)
+                yield text
+        else:
+            entry, decoder = yield from _decode_envelope(audio_file, block_size, pitch, threshold, wpm, progress,
+                                                         metrics, cache.max_bytes // 4, pieces, cancelled)
+            if entry is None:
+                return
+            if entry['envelope'] is not None:
+                cache.put_envelope(digest, pitch, entry)
+        result = {'text': ''.join(pieces), 'wpm': round(decoder.wpm, 1), 'pitch': entry['pitch'],
+                  'duration': entry['duration']}
+        cache.put_result(digest, pitch, threshold, wpm, result)
+    else:
+        if metrics is not None:
+            metrics.set('wpm', result['wpm'])
+            metrics.publish()
+        if progress is not None:
+            progress(1.0)
+        if result['text']:
+            yield result['text']
+    if stats is not None:
+        stats.update(duration=result['duration'], pitch=result['pitch'], wpm=result['wpm'])
+
+
+class _RecordingToneDetector(ToneDetector):
+    # Tone detector keeping a copy of every block of envelope it produces, for the cache.
+    # The copies are dropped, and chunks becomes None, once they grow beyond max_bytes.
+    def __init__(self, sample_rate, pitch, max_bytes):
+        super().__init__(sample_rate, pitch)
+        self.max_bytes = max_bytes
+        self.chunks = []
+        self.size = 0
+
+    def process(self, samples):
+        return self._keep(super().process(samples))
+
+    def flush(self):
+        return self._keep(super().flush())
+
+    def _keep(self, env):
+        if self.chunks is not None:
+            self.chunks.append(env.copy())
+            self.size += env.nbytes
+            if self.size > self.max_bytes:
+                self.chunks = None
+        return env
+
+
+def _decode_envelope(audio_file, block_size, pitch, threshold, wpm, progress, metrics, max_bytes, pieces, cancelled):
+    # Decode a file block by block with a StreamingMorseDecoder whose detector keeps the envelope of every block.
+    # Yield the text, add it to pieces, and return the envelope entry and the flushed decoder, or no entry
+    # once cancelled() is true.
+    # The envelope is dropped, and the entry holds None, once it grows beyond max_bytes.
+    import soundfile as sf
+    with sf.SoundFile(audio_file) as sound_file:
+        detector = _RecordingToneDetector(sound_file.samplerate, pitch, max_bytes)
+        decoder = StreamingMorseDecoder(sound_file.samplerate, detector=detector, metrics=metrics,
+                                        threshold=threshold, wpm=wpm)
+        frames = 0
+        for block in read_blocks(sound_file, block_size):
+            text = decoder.feed(block)
+            frames += len(block)
+            if progress is not None and sound_file.frames > 0:
+                progress(min(frames / sound_file.frames, 1.0))
+            if text:
+                pieces.append(text)
+                yield text
+            if cancelled is not None and cancelled():
+                return None, decoder
+    text = decoder.flush()
+    if text:
+        pieces.append(text)
+        yield text
+    chunks = detector.chunks
+    entry = {'rate': detector.rate, 'pitch': detector.pitch, 'duration': sound_file.frames / sound_file.samplerate,
+             'blocks': None if chunks is None else [chunk.size for chunk in chunks],
+             'envelope': None if chunks is None else np.concatenate(chunks)}
+    return entry, decoder
@@ -0,0 +1,208 @@
+# Continuous capture of an input stream with constant memory, for unattended monitoring.
+# The stream callback writes into a fixed-size ring buffer backed by a memory-mapped file, and a writer
+# thread spills the audio from the ring into a new audio file every segment, so a capture can run for
+# days without its memory growing.
+import os
+import threading
+import time
+
+import numpy as np
+
+from .live import BLOCK_SIZE, POLL_INTERVAL
+
+# Seconds of audio kept in the ring buffer, available to latest() without reading any file.
+RING_SECONDS = 120.0
+# Seconds of audio in each segment file.
+SEGMENT_SECONDS = 300.0
+# Format of the segment files, as a soundfile format name.
+SEGMENT_FORMAT = 'FLAC'
+# Name of the memory-mapped ring buffer file in the capture directory.
+RING_FILE_NAME = 'capture.ring'
+
+
+class MemmapRing:
+    # Ring buffer of float32 frames in a memory-mapped file, always overwriting the oldest frames.
+    # Every frame is stored twice, at its position in the ring and one capacity further, so that any
+    # run of up to capacity consecutive frames is one contiguous region of the file: reading the most
+    # recent audio returns a view, never a copy, even when it wraps around the end of the ring.
+    # The file is mapped, not loaded, so the resident memory is bounded by the pages in use.
+    def __init__(self, path, capacity, channels=1):
+        self.path = path
+        self.capacity = int(capacity)
+        self.channels = channels
+        self.buffer = np.memmap(path, dtype=np.float32, mode='w+', shape=(2 * self.capacity, channels))
+        # Total number of frames written since the ring was created, published after the frames it covers.
+        self.write_count = 0
+
+    def write(self, frames):
+        # Copy frames into the ring. Only the last capacity frames of a larger block are kept.
+        frames = np.asarray(frames, dtype=np.float32).reshape(-1, self.channels)
+        skipped = max(0, len(frames) - self.capacity)
+        frames = frames[skipped:]
+        count = len(frames)
+        start = (self.write_count + skipped) % self.capacity
+        end = start + count
+        self.buffer[start:end] = frames
+        # Write the mirror copy, wrapping to the start of the buffer when the block crosses its middle.
+        if end <= self.capacity:
+            self.buffer[start + self.capacity:end + self.capacity] = frames
+        else:
+            split = self.capacity - start
+            self.buffer[start + self.capacity:] = frames[:split]
+            self.buffer[:end - self.capacity] = frames[split:]
+        self.write_count += skipped + count
+
+    def view(self, first, count):
+        # Return a view of count frames starting at the absolute frame number first.
+        # The frames must still be in the ring; the view is valid until they are overwritten,
+        # that is until capacity frames after first have been written.
+        if first < self.write_count - self.capacity or first + count > self.write_count:
+            raise ValueError("The requested frames are not in the ring buffer.")
+        start = first % self.capacity
+        return self.buffer[start:start + count]
+
+    def latest(self, count):
+        # Return a view of the most recent count frames, or of all the frames held if there are fewer.
+        count = min(int(count), self.write_count, self.capacity)
+        return self.view(self.write_count - count, count)
+
+    def close(self):
+        # Release the ring and delete its file. The mapping itself goes away with the last view of it.
+        self.buffer.flush()
+        self.buffer = None
+        os.remove(self.path)
+
+
+class ContinuousCapture:
+    # Captures a sounddevice InputStream without a time limit.
+    # The stream callback only copies each block into a MemmapRing; a writer thread appends the new frames
+    # to the current segment file and starts a new file every segment_seconds. on_segment, when given,
+    # is called from the writer thread with the path of each completed segment.
+    # Audio can also be pushed with write() instead of a sound card, for instance from a network stream.
+    def __init__(self, directory, sample_rate=44100, channels=1, device=None, ring_seconds=RING_SECONDS,
+                 segment_seconds=SEGMENT_SECONDS, file_format=SEGMENT_FORMAT, block_size=BLOCK_SIZE, on_segment=None):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.device = device
+        self.segment_frames = int(sample_rate * segment_seconds)
+        self.file_format = file_format
+        self.block_size = block_size
+        self.on_segment = on_segment
+        os.makedirs(directory, exist_ok=True)
+        self.ring = MemmapRing(os.path.join(directory, RING_FILE_NAME), int(sample_rate * ring_seconds), channels)
+        # Number of frames spilled to segment files, and frames lost because the writer fell too far behind.
+        self.spilled_count = 0
+        self.dropped = 0
+        # Paths of the completed segment files, the open segment file and the frames written to it.
+        self.segments = []
+        self.segment_file = None
+        self.segment_path = None
+        self.segment_count = 0
+        self.started_at = None
+        self.stream = None
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def start(self, open_stream=True):
+        # Start the writer thread and open the input stream, or only the writer thread when
+        # open_stream is false and the audio is pushed with write().
+        # sounddevice is imported here so that the capture engine can be used without audio hardware.
+        if open_stream:
+            import sounddevice as sd
+        self.started_at = time.time()
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        if open_stream:
+            self.stream = sd.InputStream(samplerate=self.sample_rate, blocksize=self.block_size,
+                                         channels=self.channels, dtype='float32', device=self.device,
+                                         callback=self._callback)
+            self.stream.start()
+
+    def stop(self):
+        # Close the input stream, spill the frames still in the ring and close the last segment.
+        # The ring stays available to latest() until close() is called.
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self._spill()
+        self._close_segment()
+
+    def close(self):
+        # Stop the capture and delete the ring buffer file.
+        self.stop()
+        self.ring.close()
+
+    def write(self, frames):
+        # Add captured frames; called by the stream callback, or directly when audio comes from elsewhere.
+        self.ring.write(frames)
+
+    def latest(self, seconds):
+        # Return a view of the most recent audio, up to the length of the ring, as an array of frames.
+        return self.ring.latest(seconds * self.sample_rate)
+
+    @property
+    def duration(self):
+        # Seconds of audio captured since the start.
+        return self.ring.write_count / self.sample_rate
+
+    def _callback(self, indata, frames, time, status):
+        # Input stream callback: copy the block into the ring buffer.
+        self.ring.write(indata)
+
+    def _run(self):
+        # Writer thread: spill new frames to the segment files until the capture is stopped.
+        while not self.stopping.is_set():
+            if not self._spill():
+                self.stopping.wait(POLL_INTERVAL)
+
+    def _spill(self):
+        # Append the frames written since the last call to the segment files and return whether there were any.
+        # A writer more than half a ring behind skips ahead, so that the frames it reads
+        # cannot be overwritten by the stream callback while they are being written.
+        write_count = self.ring.write_count
+        behind = write_count - self.spilled_count
+        if behind > self.ring.capacity // 2:
+            skipped = behind - self.ring.capacity // 4
+            self.dropped += skipped
+            self.spilled_count += skipped
+        if write_count == self.spilled_count:
+            return False
+        while self.spilled_count < write_count:
+            if self.segment_file is None:
+                self._open_segment()
+            count = min(write_count - self.spilled_count, self.segment_frames - self.segment_count)
+            self.segment_file.write(self.ring.view(self.spilled_count, count))
+            self.spilled_count += count
+            self.segment_count += count
+            if self.segment_count >= self.segment_frames:
+                self._close_segment()
+        return True
+
+    def _open_segment(self):
+        # Open a new segment file, named after the capture time of its first frame.
+        # soundfile is imported here so that the decoder engine can be used without it.
+        import soundfile as sf
+        started = self.started_at + self.spilled_count / self.sample_rate
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(started))
+        extension = self.file_format.lower()
+        self.segment_path = os.path.join(self.directory, f"capture-{stamp}-{len(self.segments):05d}.{extension}")
+        self.segment_file = sf.SoundFile(self.segment_path, 'w', samplerate=self.sample_rate, channels=self.channels,
+                                         format=self.file_format)
+        self.segment_count = 0
+
+    def _close_segment(self):
+        # Close the open segment file and report it.
+        if self.segment_file is None:
+            return
+        self.segment_file.close()
+        self.segment_file = None
+        self.segments.append(self.segment_path)
+        if self.on_segment is not None:
+            self.on_segment(self.segment_path)
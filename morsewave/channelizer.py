@@ -0,0 +1,140 @@
+# Multi-channel decoding of many CW signals at different pitches in one wideband capture.
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .decoder import EnvelopeDecoder
+from .dsp import LevelTracker, to_mono
+from .tone import ENVELOPE_RATE, MIN_PITCH
+
+# Number of samples in each STFT frame; at 44.1 kHz the bins are about 43 Hz apart.
+CHANNEL_FFT_SIZE = 1024
+# Minimum ratio between the level of a carrier and the median level of all bins for a channel to open.
+# Most bins hold only noise, so the median level is the level of the noise peaks.
+CHANNEL_CONTRAST = 4.0
+# Largest level in dB below the strongest carrier at which a channel can open. Without a noise floor,
+# window leakage and key-click sidebands of a strong carrier would otherwise pass the contrast tests.
+CHANNEL_RANGE_DB = 40.0
+# Correlation above which the levels of a bin, over one block, are a scaled copy of those of a stronger
+# carrier at most CHANNEL_COPY_BINS away (its leakage or sidebands) rather than a signal of their own.
+CHANNEL_COPY_CORRELATION = 0.9
+CHANNEL_COPY_BINS = 6
+# Minimum distance in bins between two channels; closer peaks are the same drifting carrier.
+CHANNEL_SPACING = 3
+# Seconds without a carrier after which a channel is closed.
+CHANNEL_IDLE_SECONDS = 30.0
+
+
+class Channelizer:
+    # Decodes every CW carrier found in a wideband capture.
+    # Each block goes through one batched STFT, the levels of all bins are tracked together, and
+    # every bin holding a carrier gets its own EnvelopeDecoder fed from the shared keying array.
+    def __init__(self, sample_rate, fft_size=CHANNEL_FFT_SIZE, envelope_rate=ENVELOPE_RATE, min_pitch=MIN_PITCH,
+                 max_pitch=None):
+        self.sample_rate = sample_rate
+        self.fft_size = fft_size
+        # One STFT frame per hop gives an envelope at about envelope_rate.
+        self.hop = max(1, int(round(sample_rate / envelope_rate)))
+        self.rate = sample_rate / self.hop
+        self.window = np.hanning(fft_size).astype(np.float32)
+        # Scale that turns the magnitude of a Hann-windowed bin into the amplitude of a carrier.
+        self.scale = 4.0 / fft_size
+        # Range of bins searched for carriers.
+        bin_width = sample_rate / fft_size
+        self.first_bin = max(1, int(np.ceil(min_pitch / bin_width)))
+        self.last_bin = fft_size // 2 if max_pitch is None else min(fft_size // 2, int(max_pitch / bin_width))
+        self.bin_width = bin_width
+        self.levels = LevelTracker(self.rate)
+        # Samples carried over to overlap the next STFT frames.
+        self.pending = np.zeros(0, dtype=np.float32)
+        # Open channels by bin, and the time in seconds each one last had a carrier.
+        self.channels = {}
+        self.last_active = {}
+        self.time = 0.0
+
+    def frequency(self, bin_index):
+        # Return the centre frequency in Hz of a bin.
+        return round(bin_index * self.bin_width, 1)
+
+    def speeds(self):
+        # Return the current sending speed estimate of each channel in words per minute, keyed by frequency.
+        return {self.frequency(bin_index): decoder.wpm for bin_index, decoder in self.channels.items()}
+
+    def feed(self, block):
+        # Decode one block of audio and return the new text of each channel, keyed by frequency.
+        samples = np.concatenate((self.pending, to_mono(block)))
+        frames = (samples.size - self.fft_size) // self.hop + 1
+        if frames <= 0:
+            self.pending = samples
+            return {}
+        self.pending = samples[frames * self.hop:]
+        # One STFT over all the frames of the block, restricted to the searched bins.
+        view = sliding_window_view(samples, self.fft_size)[::self.hop][:frames]
+        spectra = np.abs(np.fft.rfft(view * self.window, axis=1)[:, self.first_bin:self.last_bin + 1])
+        spectra *= self.scale
+        self.time += frames / self.rate
+        # Key every bin at once against its own running levels.
+        keyed = spectra > self.levels.update(spectra)
+        self._update_channels(spectra)
+        output = {}
+        for bin_index, decoder in self.channels.items():
+            text = decoder.feed_keyed(keyed[:, bin_index - self.first_bin])
+            if text:
+                output[self.frequency(bin_index)] = text
+        self._close_idle_channels(output)
+        return output
+
+    def flush(self):
+        # End every channel and return the text still pending, keyed by frequency.
+        output = {}
+        for bin_index, decoder in self.channels.items():
+            text = decoder.flush()
+            if text:
+                output[self.frequency(bin_index)] = text
+        self.channels.clear()
+        self.last_active.clear()
+        return output
+
+    def _update_channels(self, spectra):
+        # Open a channel on every bin that holds a carrier, is a peak of the spectrum, stands within
+        # CHANNEL_RANGE_DB of the strongest carrier and is not keyed as a copy of a stronger carrier.
+        carrier = self.levels.carrier
+        strong = (self.levels.keyed() & (carrier >= np.median(carrier) * CHANNEL_CONTRAST)
+                  & (carrier >= carrier.max() * 10 ** (-CHANNEL_RANGE_DB / 20)))
+        padded = np.pad(carrier, 1)
+        peaks = np.flatnonzero(strong & (carrier >= padded[:-2]) & (carrier >= padded[2:]))
+        candidates = peaks[~self._copies(spectra, peaks)] + self.first_bin
+        if self.channels and candidates.size:
+            open_bins = np.fromiter(self.channels, dtype=int)
+            distance = np.abs(candidates[:, None] - open_bins[None, :]).min(axis=1)
+            candidates = candidates[distance >= CHANNEL_SPACING]
+        last_opened = None
+        for bin_index in candidates.tolist():
+            if last_opened is not None and bin_index - last_opened < CHANNEL_SPACING:
+                continue
+            self.channels[bin_index] = EnvelopeDecoder(self.rate)
+            last_opened = bin_index
+        for bin_index in self.channels:
+            if strong[bin_index - self.first_bin]:
+                self.last_active[bin_index] = self.time
+
+    def _copies(self, spectra, peaks):
+        # Return whether the levels of each peak over the block correlate with those of a stronger peak nearby.
+        if peaks.size < 2 or spectra.shape[0] < 2:
+            return np.zeros(peaks.size, dtype=bool)
+        levels = spectra[:, peaks] - spectra[:, peaks].mean(axis=0)
+        norms = np.linalg.norm(levels, axis=0)
+        norms[norms == 0] = np.inf
+        correlation = (levels.T @ levels) / np.outer(norms, norms)
+        carrier = self.levels.carrier[peaks]
+        stronger = carrier[None, :] > carrier[:, None]
+        near = np.abs(peaks[None, :] - peaks[:, None]) <= CHANNEL_COPY_BINS
+        return ((correlation > CHANNEL_COPY_CORRELATION) & stronger & near).any(axis=1)
+
+    def _close_idle_channels(self, output):
+        # Close the channels whose carrier has been gone for a while, keeping their last text.
+        for bin_index in [b for b in self.channels if self.time - self.last_active[b] > CHANNEL_IDLE_SECONDS]:
+            text = self.channels.pop(bin_index).flush()
+            del self.last_active[bin_index]
+            if text:
+                frequency = self.frequency(bin_index)
+                output[frequency] = output.get(frequency, '') + text
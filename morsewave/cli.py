@@ -0,0 +1,267 @@
+# Headless command line interface for decoding recordings without a display or audio hardware.
+# Only the decoder engine is imported here: no Qt, pygame or sounddevice.
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .bench import (BENCH_FADING, BENCH_JITTER, BENCH_PITCH, BENCH_REPEAT, BENCH_SNR, BENCH_WPM, DECODE_PATHS,
+                    build_cases, compare_results, run_benchmark)
+from .capture import RING_SECONDS, SEGMENT_FORMAT, SEGMENT_SECONDS, ContinuousCapture
+from .files import AUDIO_EXTENSIONS, file_digest, iter_decode_file, iter_decode_file_channels
+from .metrics import DecodeMetrics
+from .service import DEFAULT_HOST, DEFAULT_PORT, fetch_metrics, serve
+from .synth import DEFAULT_PITCH, DEFAULT_SAMPLE_RATE, DEFAULT_WPM, encode_to_file
+
+# File the results are written to when no output is given.
+DEFAULT_OUTPUT = 'results.jsonl'
+
+# Digests already present in the results cache, set once in each worker process.
+_known_digests = frozenset()
+# Whether the worker processes instrument their decodes.
+_collect_metrics = False
+
+
+def find_audio_files(directory):
+    # Return the audio files below a directory, in a stable order.
+    audio_files = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                audio_files.append(os.path.join(root, name))
+    return audio_files
+
+
+def load_known_digests(cache_path):
+    # Read the digests of the files already decoded successfully from a JSONL results file.
+    digests = set()
+    if not os.path.exists(cache_path):
+        return digests
+    with open(cache_path, encoding='utf-8') as cache:
+        for line in cache:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if 'text' in record and 'digest' in record:
+                digests.add(record['digest'])
+    return digests
+
+
+def _init_worker(known_digests, collect_metrics=False):
+    # Worker process initializer: receive the results cache once instead of with every file.
+    global _known_digests, _collect_metrics
+    _known_digests = known_digests
+    _collect_metrics = collect_metrics
+
+
+def decode_file_job(path):
+    # Decode one file in a worker process and return its result record.
+    record = {'file': path}
+    try:
+        start = time.perf_counter()
+        record['digest'] = file_digest(path)
+        record['hash_seconds'] = round(time.perf_counter() - start, 6)
+        if record['digest'] in _known_digests:
+            record['skipped'] = True
+            return record
+        start = time.perf_counter()
+        stats = {}
+        metrics = DecodeMetrics() if _collect_metrics else None
+        record['text'] = ''.join(iter_decode_file(path, stats=stats, metrics=metrics)).strip()
+        elapsed = time.perf_counter() - start
+        record.update(stats)
+        if metrics is not None:
+            record['metrics'] = metrics.snapshot()
+        record['decode_seconds'] = round(elapsed, 6)
+        record['realtime_factor'] = round(record['duration'] / elapsed, 1) if elapsed > 0 else None
+    except Exception as e:
+        record['error'] = str(e)
+    return record
+
+
+def decode_directory(directory, output, jobs=None, cache=None, metrics=None):
+    # Decode every audio file below a directory across a process pool and append the results
+    # to the output file as JSON lines. Files whose digest is in the cache are skipped.
+    # With a DecodeMetrics, every record gets the metrics of its file and they are added to metrics.
+    known_digests = frozenset(load_known_digests(cache or output))
+    audio_files = find_audio_files(directory)
+    counts = {'decoded': 0, 'skipped': 0, 'failed': 0}
+    start = time.perf_counter()
+    with open(output, 'a', encoding='utf-8') as results, \
+            ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                initargs=(known_digests, metrics is not None)) as executor:
+        futures = [executor.submit(decode_file_job, path) for path in audio_files]
+        for future in as_completed(futures):
+            record = future.result()
+            if record.get('skipped'):
+                counts['skipped'] += 1
+                continue
+            counts['failed' if 'error' in record else 'decoded'] += 1
+            if metrics is not None and 'metrics' in record:
+                metrics.merge(DecodeMetrics.from_snapshot(record['metrics']))
+            results.write(json.dumps(record, ensure_ascii=False) + '\n')
+            results.flush()
+    counts['seconds'] = round(time.perf_counter() - start, 3)
+    return counts
+
+
+def decode_channels(audio_file, output=sys.stdout):
+    # Decode every carrier of a wideband recording and print one line per channel and piece of text.
+    for texts in iter_decode_file_channels(audio_file):
+        for frequency, text in sorted(texts.items()):
+            output.write(f"{frequency:8.1f} Hz  {text}\n")
+        output.flush()
+
+
+def parse_snr(value):
+    # Parse an SNR in dB, where "none" stands for a clean signal.
+    return None if value.lower() in ('none', 'clean') else float(value)
+
+
+def benchmark(args):
+    # Run the benchmark suite, print one line per case, and write the results as JSON.
+    cases = build_cases(args.wpm, args.snr, args.pitch, args.jitter, args.fading)
+
+    def progress(record):
+        results = '  '.join(f"{name} {result['realtime_factor']}x CER {result['cer']:.3f}"
+                            for name, result in record['results'].items())
+        print(f"{record['wpm']:5g} WPM  SNR {record['snr']!s:>4}  jitter {record['jitter']:.2f}  "
+              f"fading {record['fading']:.2f}  {results}", file=sys.stderr)
+
+    results = run_benchmark(cases, repeat=args.repeat, paths=args.paths, progress=progress)
+    with open(args.output, 'w', encoding='utf-8') as output:
+        json.dump(results, output, indent=2, ensure_ascii=False)
+    for name, summary in results['summary'].items():
+        print(f"{name}: mean CER {summary['mean_cer']:.4f}, {summary['exact']}/{len(cases)} exact, "
+              f"median real-time factor {summary['median_realtime_factor']}, peak memory {summary['max_peak_mb']} MB",
+              file=sys.stderr)
+    print(f"Peak RSS of the whole run {results['peak_rss_mb']} MB. Results written to {args.output}.", file=sys.stderr)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline:
+            for line in compare_results(json.load(baseline), results):
+                print(line)
+
+
+def capture(args):
+    # Record an input device into segment files until interrupted, printing each completed segment.
+    recorder = ContinuousCapture(args.directory, args.rate, device=args.device, ring_seconds=args.ring_seconds,
+                                 segment_seconds=args.segment_seconds, file_format=args.format,
+                                 on_segment=lambda path: print(path, flush=True))
+    try:
+        recorder.start()
+        print(f"Capturing into {args.directory}; press Ctrl+C to stop.", file=sys.stderr)
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recorder.close()
+    print(f"Captured {recorder.duration:.1f} seconds, dropped {recorder.dropped} frames.", file=sys.stderr)
+
+
+def build_parser():
+    # Build the argument parser with one sub-command per task.
+    parser = argparse.ArgumentParser(prog='python -m morsewave', description='Morse Wave Translator command line tools.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    decode = commands.add_parser('decode', help='decode every audio file in a directory')
+    decode.add_argument('directory', help='directory searched recursively for audio files')
+    decode.add_argument('--jobs', '-j', type=int, default=None, help='number of worker processes (default: all CPUs)')
+    decode.add_argument('--output', '-o', default=DEFAULT_OUTPUT, help='JSONL file the results are appended to')
+    decode.add_argument('--cache', default=None,
+                        help='JSONL results file of files to skip (default: the output file)')
+    decode.add_argument('--metrics', default=None,
+                        help='file the decoding metrics of the run are written to, in the Prometheus text format')
+
+    channels = commands.add_parser('channels', help='decode every CW signal of a wideband recording')
+    channels.add_argument('file', help='audio file holding several CW signals at different pitches')
+
+    encode = commands.add_parser('encode', help='synthesize the CW audio of a text into an audio file')
+    encode.add_argument('text', help='text to encode; "-" reads it from standard input')
+    encode.add_argument('--output', '-o', required=True, help='audio file to write')
+    encode.add_argument('--wpm', type=float, default=DEFAULT_WPM, help='sending speed in words per minute')
+    encode.add_argument('--pitch', type=float, default=DEFAULT_PITCH, help='tone frequency in Hz')
+    encode.add_argument('--rate', type=int, default=DEFAULT_SAMPLE_RATE, help='sample rate in Hz')
+
+    record = commands.add_parser('capture', help='record an input device without a time limit into segment files')
+    record.add_argument('directory', help='directory the segment files are written to')
+    record.add_argument('--device', type=int, default=None, help='input device index (default: the system default)')
+    record.add_argument('--rate', type=int, default=DEFAULT_SAMPLE_RATE, help='sample rate in Hz')
+    record.add_argument('--segment-seconds', type=float, default=SEGMENT_SECONDS, help='length of each segment file')
+    record.add_argument('--ring-seconds', type=float, default=RING_SECONDS,
+                        help='seconds of recent audio kept in the memory-mapped ring buffer')
+    record.add_argument('--format', default=SEGMENT_FORMAT, choices=('FLAC', 'WAV'), help='segment file format')
+
+    service = commands.add_parser('serve', help='decode PCM streams sent over TCP connections')
+    service.add_argument('--host', default=DEFAULT_HOST, help='address to listen on')
+    service.add_argument('--port', type=int, default=DEFAULT_PORT, help='port to listen on')
+    service.add_argument('--workers', type=int, default=None, help='decoding threads (default: all CPUs)')
+    service.add_argument('--no-metrics', dest='metrics', action='store_false',
+                         help='do not instrument the decoding; metrics requests are then refused')
+    metrics = commands.add_parser('metrics', help='print the decoding metrics of a running service')
+    metrics.add_argument('--host', default=DEFAULT_HOST, help='address of the service')
+    metrics.add_argument('--port', type=int, default=DEFAULT_PORT, help='port of the service')
+
+    bench = commands.add_parser('bench', help='measure decoding speed and accuracy on synthetic signals')
+    bench.add_argument('--output', '-o', default='bench.json', help='JSON file the results are written to')
+    bench.add_argument('--baseline', default=None, help='JSON results of an earlier run to compare with')
+    bench.add_argument('--repeat', type=int, default=BENCH_REPEAT, help='timed runs per decode path')
+    bench.add_argument('--wpm', type=float, nargs='+', default=BENCH_WPM, help='sending speeds')
+    bench.add_argument('--snr', type=parse_snr, nargs='+', default=BENCH_SNR,
+                       help='SNRs in dB within 2.5 kHz, "none" for a clean signal')
+    bench.add_argument('--pitch', type=float, nargs='+', default=BENCH_PITCH, help='tone frequencies in Hz')
+    bench.add_argument('--jitter', type=float, nargs='+', default=BENCH_JITTER,
+                       help='relative timing jitter of the runs, as with a hand key')
+    bench.add_argument('--fading', type=float, nargs='+', default=BENCH_FADING, help='fading depths from 0 to 1')
+    bench.add_argument('--paths', nargs='+', choices=sorted(DECODE_PATHS), default=None,
+                       help='decode paths to measure (default: all)')
+    return parser
+
+
+def main(argv=None):
+    # Entry point of "python -m morsewave".
+    args = build_parser().parse_args(argv)
+    if args.command == 'decode':
+        if not os.path.isdir(args.directory):
+            print(f"Error: {args.directory} is not a directory.", file=sys.stderr)
+            return 2
+        metrics = DecodeMetrics() if args.metrics else None
+        counts = decode_directory(args.directory, args.output, args.jobs, args.cache, metrics)
+        print(f"Decoded {counts['decoded']} files, skipped {counts['skipped']}, failed {counts['failed']} "
+              f"in {counts['seconds']} seconds.", file=sys.stderr)
+        if metrics is not None:
+            with open(args.metrics, 'w', encoding='utf-8') as metrics_file:
+                metrics_file.write(metrics.to_prometheus())
+        return 1 if counts['failed'] else 0
+    if args.command == 'channels':
+        decode_channels(args.file)
+    if args.command == 'encode':
+        text = sys.stdin.read() if args.text == '-' else args.text
+        try:
+            frames = encode_to_file(args.output, text, args.wpm, args.pitch, args.rate)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+        print(f"Wrote {frames / args.rate:.1f} seconds of audio to {args.output}.", file=sys.stderr)
+    if args.command == 'capture':
+        capture(args)
+    if args.command == 'serve':
+        print(f"Serving on {args.host}:{args.port}; press Ctrl+C to stop.", file=sys.stderr)
+        try:
+            serve(args.host, args.port, args.workers, args.metrics)
+        except KeyboardInterrupt:
+            pass
+    if args.command == 'metrics':
+        try:
+            sys.stdout.write(asyncio.run(fetch_metrics(args.host, args.port)))
+        except (OSError, RuntimeError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    if args.command == 'bench':
+        benchmark(args)
+    return 0
@@ -0,0 +1,61 @@
+# Morse code tables shared by the decoder engine and the graphical front-ends.
+import numpy as np
+
+# Morse code dictionary mapping letters, numbers and punctuation to Morse code representations (ITU set).
+MORSE_CODE_DICT = {
+    'A': '.-', 'B': '-...', 'C': '-.-.', 'D': '-..', 'E': '.',
+    'F': '..-.', 'G': '--.', 'H': '....', 'I': '..', 'J': '.---',
+    'K': '-.-', 'L': '.-..', 'M': '--', 'N': '-.', 'O': '---',
+    'P': '.--.', 'Q': '--.-', 'R': '.-.', 'S': '...', 'T': '-',
+    'U': '..-', 'V': '...-', 'W': '.--', 'X': '-..-', 'Y': '-.--', 'Z': '--..',
+    '1': '.----', '2': '..---', '3': '...--', '4': '....-', '5': '.....',
+    '6': '-....', '7': '--...', '8': '---..', '9': '----.', '0': '-----',
+    '.': '.-.-.-', ',': '--..--', ':': '---...', '?': '..--..', "'": '.----.',
+    '-': '-....-', '/': '-..-.', '(': '-.--.', ')': '-.--.-', '"': '.-..-.',
+    '=': '-...-', '+': '.-.-.', '@': '.--.-.', '&': '.-...', ';': '-.-.-.',
+    '!': '-.-.--', '_': '..--.-', '$': '...-..-', 'É': '..-..'
+}
+
+# Prosigns without a character of their own, written between angle brackets.
+# Prosigns that share a code with a character (AR "+", BT "=", KN "(", AS "&") decode as that character.
+PROSIGNS = {
+    '<SK>': '...-.-', '<KA>': '-.-.-', '<SN>': '...-.', '<HH>': '........', '<SOS>': '...---...'
+}
+
+# Table mapping every character and prosign to its Morse code, used to encode text.
+ENCODE_TABLE = {**MORSE_CODE_DICT, **PROSIGNS}
+
+# Reverse table mapping each Morse code representation back to its character.
+DECODE_TABLE = {code: char for char, code in ENCODE_TABLE.items()}
+
+# Longest code that can be decoded.
+MAX_CODE_LENGTH = 9
+
+
+def code_index(code):
+    # Return the index of a code in SYMBOL_TABLE.
+    # A leading 1 bit is followed by one bit per element, 0 for a dot and 1 for a dash, so the index
+    # is the node number of the code in a binary trie stored as a heap: the children of node n are
+    # 2n (dot) and 2n + 1 (dash), and (length, bits) map to the single integer (1 << length) | bits.
+    index = 1
+    for element in code:
+        index = 2 * index + (element == '-')
+    return index
+
+
+# Flat array form of the binary trie: one entry per index, "?" where no character has that code.
+# Decoding a symbol is one array lookup, vectorized over many symbols at once.
+SYMBOL_TABLE = np.full(1 << (MAX_CODE_LENGTH + 1), '?', dtype='<U5')
+# Whether each index is the code of a character, which tells unknown codes from the question mark itself.
+KNOWN_CODES = np.zeros(SYMBOL_TABLE.size, dtype=bool)
+for _code, _char in DECODE_TABLE.items():
+    SYMBOL_TABLE[code_index(_code)] = _char
+    KNOWN_CODES[code_index(_code)] = True
+del _code, _char
+# The same table as a list, for decoding one symbol at a time without NumPy scalar overhead.
+SYMBOL_LIST = SYMBOL_TABLE.tolist()
+
+
+def decode_index(index):
+    # Return the character of a symbol index, or "?" when the code is not recognized.
+    return SYMBOL_LIST[index] if index < len(SYMBOL_LIST) else '?'
@@ -0,0 +1,302 @@
+# Morse decoder engine: turns audio samples into text with vectorized NumPy stages.
+import time
+
+import numpy as np
+
+from .codes import KNOWN_CODES, MAX_CODE_LENGTH, SYMBOL_TABLE, decode_index
+from .dsp import (GLITCH_DURATION, THRESHOLD_POSITION, LevelTracker, level_threshold, merge_short_runs, run_lengths,
+                  running_threshold, signal_levels, to_mono)
+from .metrics import level_ratio_db
+from .timing import DEFAULT_WPM, TimingModel
+from .tone import ToneDetector
+
+# Number of samples decoded at a time when an in-memory recording is decoded incrementally.
+DECODE_BLOCK_SIZE = 65536
+
+
+def timing_model(rate, wpm=None):
+    # Return the timing model for a sending speed: adaptive from DEFAULT_WPM when wpm is None,
+    # or fixed at the given speed in words per minute.
+    return TimingModel(rate, wpm=wpm or DEFAULT_WPM, fixed=wpm is not None)
+
+
+def runs_to_text(states, lengths, timing, metrics=None):
+    # Translate runs into text, classifying them with a timing model that follows the sending speed.
+    # metrics, a DecodeMetrics, times the timing, symbol and text stages and counts the symbols.
+    # Leading and trailing silence carries no information.
+    marks = np.flatnonzero(states)
+    if marks.size == 0:
+        return ""
+    if metrics is not None:
+        start = time.perf_counter()
+    states = states[marks[0]:marks[-1] + 1]
+    lengths = lengths[marks[0]:marks[-1] + 1]
+    dash_limit, char_gap_limit, word_gap_limit = timing.track(states, lengths).T
+    if metrics is not None:
+        start = metrics.add_time('timing', start)
+    gaps = ~states
+    breaks = gaps & (lengths >= char_gap_limit)
+    # As in the streaming decoder, the marks of a character are classified with the dash limit
+    # in force at the gap that ends the character.
+    positions = np.where(breaks, np.arange(states.size), states.size - 1)
+    char_ends = np.minimum.accumulate(positions[::-1])[::-1]
+    dashes = lengths >= dash_limit[char_ends]
+    # Number the characters, and place every mark within its character.
+    mark_positions = np.flatnonzero(states)
+    characters = np.cumsum(breaks)[mark_positions]
+    counts = np.bincount(characters)
+    starts = np.cumsum(counts) - counts
+    places = np.arange(mark_positions.size) - starts[characters]
+    # Build the symbol index of every character straight from its marks: a leading 1 bit followed by
+    # one bit per mark, 1 for a dash. Characters longer than any code get index 0, which is "?".
+    too_long = counts > MAX_CODE_LENGTH
+    shifts = np.where(too_long[characters], 0, counts[characters] - 1 - places)
+    bits = np.bincount(characters, weights=dashes[mark_positions].astype(np.int64) << shifts)
+    indices = np.where(too_long, 0, (1 << np.minimum(counts, MAX_CODE_LENGTH)) + bits.astype(np.int64))
+    # Look every character up at once, then add a space after the characters that end a word.
+    text = SYMBOL_TABLE[indices].astype(object)
+    if metrics is not None:
+        start = metrics.add_time('symbols', start)
+        metrics.count('symbols', indices.size)
+        metrics.count('unknown_symbols', indices.size - np.count_nonzero(KNOWN_CODES[indices]))
+    text[:-1][(lengths >= word_gap_limit)[breaks]] += ' '
+    text = ''.join(text.tolist())
+    if metrics is not None:
+        metrics.add_time('text', start)
+    return text
+
+
+def decode_samples(audio_data, sample_rate, pitch=None, detector=None, metrics=None, threshold=None, wpm=None):
+    # Decode a complete block of audio samples into text.
+    # The detector turns audio into an envelope; by default a tone detector tuned to the pitch,
+    # or to the strongest tone found in the audio when no pitch is given.
+    # threshold places the keying threshold between the noise floor (0) and the carrier level (1),
+    # THRESHOLD_POSITION when None, and wpm fixes the sending speed instead of following it.
+    # metrics, a DecodeMetrics, receives the stage timings, counters, sending speed and SNR of the decode.
+    if metrics is not None:
+        start = time.perf_counter()
+    if detector is None:
+        detector = ToneDetector(sample_rate, pitch)
+    samples = to_mono(audio_data)
+    # Extract the envelope and key it against an adaptive threshold.
+    env = np.concatenate((detector.process(samples), detector.flush()))
+    if metrics is not None:
+        start = metrics.add_time('envelope', start)
+        metrics.count('samples', samples.size)
+    rate = detector.rate
+    levels = signal_levels(env, stride=int(rate * 0.001))
+    position = threshold or THRESHOLD_POSITION
+    # The whole recording must hold a keyed carrier; each part of it is then keyed against the levels
+    # around it, which follow slow fading.
+    if levels is None or level_threshold(*levels, position=position) is None:
+        threshold = None
+    else:
+        threshold = running_threshold(env, rate, position)
+    if metrics is not None:
+        start = metrics.add_time('threshold', start)
+        metrics.set('snr_db', None if levels is None else level_ratio_db(*levels))
+    if threshold is None:
+        if metrics is not None:
+            metrics.publish()
+        return ""
+    # Run-length encode the keying and drop glitches shorter than a fraction of a dot.
+    states, lengths = run_lengths(env > threshold)
+    states, lengths = merge_short_runs(states, lengths, int(rate * GLITCH_DURATION))
+    if metrics is not None:
+        metrics.add_time('runs', start)
+        metrics.count('runs', states.size)
+    # Classify the runs with a timing model that follows the sending speed through the recording.
+    timing = timing_model(rate, wpm)
+    text = runs_to_text(states, lengths, timing, metrics)
+    if metrics is not None:
+        metrics.set('wpm', timing.wpm)
+        metrics.publish()
+    return text
+
+
+def iter_decode_samples(audio_data, sample_rate, block_size=DECODE_BLOCK_SIZE, pitch=None, progress=None,
+                        metrics=None, threshold=None, wpm=None, cancelled=None):
+    # Decode an in-memory recording block by block and yield the text as soon as it is decoded.
+    # progress, when given, is called after every block with the fraction of the recording decoded,
+    # and the decoding stops after the block once cancelled() is true, even when it produced no text.
+    samples = to_mono(audio_data)
+    decoder = StreamingMorseDecoder(sample_rate, pitch, metrics=metrics, threshold=threshold, wpm=wpm)
+    for start in range(0, samples.size, block_size):
+        text = decoder.feed(samples[start:start + block_size])
+        if progress is not None:
+            progress(min(start + block_size, samples.size) / samples.size)
+        if text:
+            yield text
+        if cancelled is not None and cancelled():
+            return
+    text = decoder.flush()
+    if text:
+        yield text
+
+
+class EnvelopeDecoder:
+    # Incremental decoder for an envelope that arrives in blocks.
+    # The signal levels, the current run and the partial symbol are kept between calls,
+    # so that feed() can be called with blocks of any size.
+    # threshold and wpm set the keying threshold position and a fixed sending speed as in decode_samples().
+    def __init__(self, rate, metrics=None, threshold=None, wpm=None):
+        # Rate of the envelope in values per second.
+        self.rate = rate
+        # DecodeMetrics receiving the stage timings and counters of every block, or None.
+        self.metrics = metrics
+        self.levels = LevelTracker(rate, position=threshold or THRESHOLD_POSITION)
+        # Runs shorter than this are glitches and do not change the keying state.
+        self.min_run = int(rate * GLITCH_DURATION)
+        # Online model of the dot length, updated with every mark and space.
+        self.timing = timing_model(rate, wpm)
+        # Accepted keying state and the length of the current run.
+        self.state = False
+        self.run_length = 0
+        # Last raw run of the previous block, which may still turn out to be a glitch.
+        self.tail_state = False
+        self.tail_length = 0
+        # Mark lengths of the character being received, classified once the character is complete.
+        self.symbol = []
+        # Whether the last word has already been ended, so that a long space gives one word break.
+        self.word_ended = True
+        # Whether the first mark has been received.
+        self.started = False
+
+    @property
+    def wpm(self):
+        # Current estimate of the sending speed in words per minute.
+        return self.timing.wpm
+
+    def feed(self, env):
+        # Key a block of envelope values against the running levels and return the characters completed by it.
+        if self.metrics is None:
+            return self.feed_keyed(env > self.levels.update(env))
+        start = time.perf_counter()
+        keyed = env > self.levels.update(env)
+        self.metrics.add_time('threshold', start)
+        if self.levels.noise is not None:
+            self.metrics.set('snr_db', level_ratio_db(self.levels.noise, self.levels.carrier))
+        return self.feed_keyed(keyed)
+
+    def flush(self):
+        # End the stream and return the characters still pending.
+        output = []
+        if self.state:
+            self._add_mark(self.run_length)
+            self.state, self.run_length = False, 0
+        self.tail_length = 0
+        self._end_gap(output, final=True)
+        return ''.join(output)
+
+    def publish(self):
+        # Set the sending speed gauge, once a mark has been measured, and publish the metrics to their listeners.
+        # feed() and flush() leave this to the caller, which publishes once per block of audio.
+        if self.metrics is None:
+            return
+        if self.started:
+            self.metrics.set('wpm', self.wpm)
+        self.metrics.publish()
+
+    def feed_keyed(self, keyed):
+        # Decode a block of key-down states and return the characters completed by it.
+        if self.metrics is not None:
+            start = time.perf_counter()
+        states, lengths = run_lengths(keyed)
+        if self.metrics is not None:
+            start = self.metrics.add_time('runs', start)
+            self.metrics.count('runs', states.size)
+        if states.size == 0:
+            return ''
+        # The first run of the block continues the last run of the previous block.
+        if states[0] == self.tail_state:
+            lengths[0] += self.tail_length
+        elif self.tail_length:
+            states = np.concatenate(([self.tail_state], states))
+            lengths = np.concatenate(([self.tail_length], lengths))
+        # Every run except the last one is complete; there are only a few runs per block.
+        output = []
+        for state, length in zip(states[:-1].tolist(), lengths[:-1].tolist()):
+            self._push_run(state, length, output)
+        self.tail_state, self.tail_length = bool(states[-1]), int(lengths[-1])
+        # The last run is accepted as soon as it is too long to be a glitch.
+        if self.tail_state == self.state or self.tail_length >= self.min_run:
+            self._push_run(self.tail_state, self.tail_length, output)
+            self.tail_length = 0
+        # Characters and words end as soon as the current space is long enough.
+        if not self.state:
+            self._end_gap(output)
+        if self.metrics is not None:
+            # Runs are timed and looked up together here, one run at a time.
+            self.metrics.add_time('symbols', start)
+        return ''.join(output)
+
+    def _push_run(self, state, length, output):
+        # Add a run to the current one, or finish the current run when the keying state changes.
+        if state == self.state or length < self.min_run:
+            self.run_length += length
+            return
+        if self.state:
+            self._add_mark(self.run_length)
+        else:
+            # Silence before the first character says nothing about the timing.
+            if self.started:
+                self.timing.add_space(self.run_length)
+            self._end_gap(output)
+            self.word_ended = False
+        self.state, self.run_length = state, length
+        self.started = True
+
+    def _add_mark(self, length):
+        # Add a mark to the character being received and to the timing model.
+        self.symbol.append(length)
+        self.timing.add_mark(length)
+
+    def _end_gap(self, output, final=False):
+        # Emit the pending character and word break once the current space is long enough.
+        if self.state:
+            return
+        if self.symbol and (final or self.run_length >= self.timing.char_gap_limit()):
+            # Build the symbol index from the marks and look the character up in one step.
+            dash_limit = self.timing.dash_limit()
+            index = 1
+            for length in self.symbol:
+                index = 2 * index + (length >= dash_limit)
+            output.append(decode_index(index))
+            self.symbol = []
+            if self.metrics is not None:
+                self.metrics.count('symbols')
+                self.metrics.count('unknown_symbols', not (index < KNOWN_CODES.size and KNOWN_CODES[index]))
+        if not self.word_ended and not final and self.run_length >= self.timing.word_gap_limit():
+            output.append(' ')
+            self.word_ended = True
+
+
+class StreamingMorseDecoder(EnvelopeDecoder):
+    # Incremental decoder for audio that arrives in blocks, such as a live input stream.
+    # The detector state is kept between calls along with the decoding state.
+    # With metrics, the metrics are published after every block.
+    def __init__(self, sample_rate, pitch=None, detector=None, metrics=None, threshold=None, wpm=None):
+        self.sample_rate = sample_rate
+        # Front-end turning audio into an envelope.
+        self.detector = detector if detector is not None else ToneDetector(sample_rate, pitch)
+        super().__init__(self.detector.rate, metrics, threshold, wpm)
+
+    def feed(self, block):
+        # Decode one block of audio and return the characters completed by it.
+        if self.metrics is None:
+            return super().feed(self.detector.process(to_mono(block)))
+        start = time.perf_counter()
+        samples = to_mono(block)
+        env = self.detector.process(samples)
+        self.metrics.add_time('envelope', start)
+        self.metrics.count('samples', samples.size)
+        text = super().feed(env)
+        self.publish()
+        return text
+
+    def flush(self):
+        # Decode the audio still held by the detector, then end the stream.
+        # Audio shorter than the pitch search is only decoded here, so the metrics are published again.
+        text = super().feed(self.detector.flush()) + super().flush()
+        self.publish()
+        return text
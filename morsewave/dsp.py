@@ -0,0 +1,179 @@
+# Vectorized signal processing stages used by the Morse decoder engine.
+# Every function works on whole NumPy arrays; no stage loops over individual samples.
+import numpy as np
+
+# Length of the envelope smoothing window in seconds (a few periods of a CW tone).
+ENVELOPE_WINDOW = 0.005
+# Runs shorter than this many seconds are treated as glitches and merged into their neighbours.
+GLITCH_DURATION = 0.01
+# Percentiles of the envelope used as the noise floor and the carrier level.
+NOISE_PERCENTILE = 5
+CARRIER_PERCENTILE = 99
+# Minimum carrier to noise floor ratio for the audio to be considered keyed at all.
+MIN_CONTRAST = 2.0
+# Default position of the keying threshold between the noise floor (0) and the carrier level (1).
+THRESHOLD_POSITION = 0.5
+# Time constant in seconds of the running level estimates used by streaming decoders.
+LEVEL_TIME_CONSTANT = 5.0
+# Length in seconds of the blocks whose levels are measured by running_levels().
+LEVEL_BLOCK = 0.5
+
+
+def to_mono(audio_data):
+    # Convert the audio data to a float32 array, mixing multi-channel audio down to mono.
+    # Single-channel audio is returned as a view of its only column, without a copy.
+    samples = np.asarray(audio_data, dtype=np.float32)
+    if samples.ndim > 1:
+        if samples.shape[1] == 1:
+            return samples[:, 0]
+        samples = samples.mean(axis=1, dtype=np.float32)
+    return samples
+
+
+class EnvelopeFollower:
+    # Stateful envelope extractor for audio that arrives in blocks.
+    # The rectified signal is smoothed with a trailing moving average computed from a cumulative sum,
+    # and the end of the smoothing window is carried over so that block boundaries leave no trace.
+    def __init__(self, sample_rate, window=ENVELOPE_WINDOW):
+        # The envelope has one value per sample.
+        self.rate = sample_rate
+        # Number of samples averaged for each envelope value.
+        self.width = max(1, int(sample_rate * window))
+        # Rectified samples from the end of the previous block.
+        self.history = np.zeros(0, dtype=np.float32)
+
+    def process(self, samples):
+        # Return the envelope of the block, one value per input sample.
+        rectified = np.abs(np.asarray(samples, dtype=np.float32))
+        joined = np.concatenate((self.history, rectified))
+        cumulative = np.concatenate(([0.0], np.cumsum(joined, dtype=np.float64)))
+        # Each output averages the window ending at its sample, or as much of it as has been seen.
+        ends = np.arange(self.history.size + 1, joined.size + 1)
+        starts = np.maximum(ends - self.width, 0)
+        smoothed = ((cumulative[ends] - cumulative[starts]) / (ends - starts)).astype(np.float32)
+        self.history = joined[-self.width:]
+        return smoothed
+
+    def flush(self):
+        # Every sample has already produced its envelope value.
+        return np.zeros(0, dtype=np.float32)
+
+
+class LevelTracker:
+    # Running estimate of the noise floor and the carrier level for a streamed envelope.
+    # The carrier level decays slowly and the noise floor rises slowly, so that a long mark
+    # or a long silence does not pull the threshold away from the keyed signal.
+    # A two-dimensional envelope tracks one level pair per column in a single pass.
+    def __init__(self, sample_rate, time_constant=LEVEL_TIME_CONSTANT, position=THRESHOLD_POSITION):
+        self.sample_rate = sample_rate
+        self.time_constant = time_constant
+        self.position = position
+        self.noise = None
+        self.carrier = 0.0
+
+    def update(self, env):
+        # Update the levels from one block of envelope values and return the keying threshold.
+        if env.shape[0] == 0:
+            return self.threshold()
+        noise, carrier = np.percentile(env, [NOISE_PERCENTILE, CARRIER_PERCENTILE], axis=0)
+        decay = np.exp(-env.shape[0] / (self.sample_rate * self.time_constant))
+        self.carrier = np.maximum(carrier, self.carrier * decay)
+        if self.noise is None:
+            self.noise = noise
+        else:
+            self.noise = np.where(noise < self.noise, noise, noise + (self.noise - noise) * decay)
+        return self.threshold()
+
+    def keyed(self):
+        # Return whether the carrier stands far enough above the noise floor to be keyed.
+        if self.noise is None:
+            return np.zeros(np.shape(self.carrier), dtype=bool)
+        return (self.carrier > 0) & (self.carrier >= self.noise * MIN_CONTRAST)
+
+    def threshold(self):
+        # Place the threshold at its position between the levels, or at infinity while nothing is keyed.
+        if self.noise is None:
+            return np.inf
+        return np.where(self.keyed(), self.noise + self.position * (self.carrier - self.noise), np.inf)
+
+
+def envelope(samples, sample_rate, window=ENVELOPE_WINDOW):
+    # Rectify the signal and smooth it with a trailing moving average.
+    return EnvelopeFollower(sample_rate, window).process(samples)
+
+
+def signal_levels(env, stride=1):
+    # Return the noise floor and the carrier level of an envelope, or None for an empty envelope.
+    # The envelope is smooth, so the levels can be measured on a strided subset of it.
+    levels = env[::max(1, stride)]
+    if levels.size == 0:
+        return None
+    noise, carrier = np.percentile(levels, [NOISE_PERCENTILE, CARRIER_PERCENTILE])
+    return noise, carrier
+
+
+def running_levels(env, rate, block=LEVEL_BLOCK, time_constant=LEVEL_TIME_CONSTANT):
+    # Return the noise floor and the carrier level around every value of a whole envelope, so that slow
+    # fading does not push the marks below a global threshold. The levels of each block decay towards
+    # the blocks around it as LevelTracker's do, but in both directions: the carrier level is the largest
+    # block level times exp(-distance / time_constant), and the noise floor the lowest block level times
+    # exp(distance / time_constant). Both are running extrema on a log scale, so no stage loops over blocks.
+    length = max(1, int(rate * block))
+    count = -(-env.size // length)
+    padded = np.pad(env, (0, count * length - env.size), mode='edge') if env.size else env
+    noise, carrier = np.percentile(padded.reshape(count, length), [NOISE_PERCENTILE, CARRIER_PERCENTILE], axis=1)
+    slope = block / time_constant * np.arange(count)
+    with np.errstate(divide='ignore'):
+        carrier = _decaying_extremum(np.log(carrier), slope, np.maximum)
+        noise = -_decaying_extremum(-np.log(noise), slope, np.maximum)
+    return np.repeat(np.exp(noise), length)[:env.size], np.repeat(np.exp(carrier), length)[:env.size]
+
+
+def _decaying_extremum(values, slope, extremum):
+    # For every index i, the extremum over j of values[j] - |slope[i] - slope[j]|, in two passes.
+    forward = extremum.accumulate(values + slope) - slope
+    backward = (extremum.accumulate((values - slope)[::-1]) + slope[::-1])[::-1]
+    return extremum(forward, backward)
+
+
+def level_threshold(noise, carrier, position=THRESHOLD_POSITION):
+    # Place the keying threshold at its position between the noise floor and the carrier level.
+    # Without enough contrast there is no keyed carrier to decode, and the threshold is None.
+    if carrier <= 0 or carrier < noise * MIN_CONTRAST:
+        return None
+    return noise + position * (carrier - noise)
+
+
+def running_threshold(env, rate, position=THRESHOLD_POSITION):
+    # Place a keying threshold for every value of an envelope between its running levels, at infinity
+    # where the carrier does not stand far enough above the noise floor to be keyed.
+    noise, carrier = running_levels(env, rate)
+    keyed = (carrier > 0) & (carrier >= noise * MIN_CONTRAST)
+    return np.where(keyed, noise + position * (carrier - noise), np.inf)
+
+
+def detect_threshold(env, stride=1):
+    # Measure the levels of an envelope and place the keying threshold between them.
+    levels = signal_levels(env, stride)
+    return None if levels is None else level_threshold(*levels)
+
+
+def run_lengths(keyed):
+    # Run-length encode a boolean key-down array into run states and run lengths.
+    if keyed.size == 0:
+        return np.zeros(0, dtype=bool), np.zeros(0, dtype=np.int64)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(keyed)) + 1))
+    lengths = np.diff(np.append(starts, keyed.size))
+    return keyed[starts], lengths
+
+
+def merge_short_runs(states, lengths, min_length):
+    # Give every run shorter than min_length the state of the last long run before it,
+    # then join the neighbouring runs that now share the same state.
+    short = lengths < min_length
+    if not short.any():
+        return states, lengths
+    index = np.where(short, 0, np.arange(states.size))
+    states = states[np.maximum.accumulate(index)]
+    starts = np.flatnonzero(np.concatenate(([True], states[1:] != states[:-1])))
+    return states[starts], np.add.reduceat(lengths, starts)
@@ -0,0 +1,179 @@
+# Morse decoder used by the graphical front-ends and by scripts: recording, decoding, playback and saving.
+# Importing this module and creating a MorseDecoder only costs the standard library. NumPy, the decoder
+# stages and the audio backends (sounddevice for capture, soundfile for files, pygame for playback) are
+# imported the first time a method needs them, so the decoder starts quickly and runs on headless
+# machines that have no display, no audio device and none of the audio packages it does not use.
+
+
+class MorseDecoder:
+    # Holds the last recorded or synthesized audio and the sending speed of the last decoded file.
+    def __init__(self, sample_rate=44100):
+        # Sample rate of recordings and synthesized audio.
+        self.sample_rate = sample_rate
+        # Recorded or synthesized audio as an AudioBuffer, or None before there is any.
+        self.audio = None
+        # Estimated sending speed, in words per minute, of the last decoded file.
+        self.wpm = None
+        # Whether the pygame mixer has been initialized for playback.
+        self.mixer_ready = False
+        # DecodeMetrics instrumenting every decode, or None to decode without instrumentation.
+        self.metrics = None
+        # Decoder parameters of audio files: the pitch in Hz, the position of the keying threshold between
+        # the noise floor (0) and the carrier (1), and a fixed sending speed; None finds each from the signal.
+        self.pitch = None
+        self.threshold = None
+        self.fixed_wpm = None
+        # Whether decoded files are kept in the DecodeCache database at cache_path (by default in the
+        # user's cache directory), so that opening a file again returns its text without decoding it.
+        self.use_cache = False
+        self.cache_path = None
+        # ScopeBuffer fed with the audio being recorded or listened to, for a live display, or None.
+        self.scope = None
+        # Whether decode() uses the soft-decision beam search instead of the threshold decoder, and the
+        # character bigram model (from soft.train_bigrams()) it weighs the characters with, if any.
+        self.soft_decision = False
+        self.bigrams = None
+
+    def has_audio(self):
+        # Return whether there is recorded or synthesized audio to decode, play or save.
+        return self.audio is not None and len(self.audio) > 0
+
+    def decode(self, audio_data, sample_rate=None, on_text=None, on_progress=None, cancelled=None):
+        # Decode the audio data with the vectorized decoder engine.
+        # The engine extracts the signal envelope, splits it into on/off runs and classifies
+        # the runs into dots, dashes and gaps before looking up each character.
+        from .decoder import decode_samples, iter_decode_samples
+        if self.soft_decision:
+            return self._soft_decode(audio_data, sample_rate or self.sample_rate, on_text, on_progress, cancelled)
+        if on_text is None and on_progress is None:
+            return decode_samples(audio_data, sample_rate or self.sample_rate, metrics=self.metrics)
+        # When partial text or progress is wanted, the audio is decoded block by block instead.
+        # Each piece of text is passed to on_text, and the decoding stops early once cancelled() is true.
+        pieces = []
+        self._collect(iter_decode_samples(audio_data, sample_rate or self.sample_rate, progress=on_progress,
+                                          metrics=self.metrics, cancelled=cancelled), pieces, on_text, cancelled)
+        return ''.join(pieces).strip()
+
+    def _soft_decode(self, audio_data, sample_rate, on_text, on_progress, cancelled):
+        # Decode the audio data with the soft-decision decoder, which searches the whole signal at once:
+        # the progress is reported as the search goes, and the text comes in one piece when it is done,
+        # or when cancelled() stops it early with the text found so far.
+        from .soft import soft_decode_samples
+        text = soft_decode_samples(audio_data, sample_rate, self.pitch, bigrams=self.bigrams, wpm=self.fixed_wpm,
+                                   metrics=self.metrics, progress=on_progress, cancelled=cancelled)
+        if on_text is not None and text:
+            on_text(text)
+        return text
+
+    def record_audio(self, duration, input_device_index=None, on_text=None, on_progress=None, cancelled=None):
+        # Record audio from an input device for the specified duration in seconds.
+        # The audio is captured block by block, so that the progress can be passed to on_progress
+        # and the recording can be stopped early once cancelled() is true.
+        # Return the duration actually recorded, in seconds.
+        import numpy as np
+        import sounddevice as sd
+        from .buffer import AudioBuffer
+        num_samples = int(self.sample_rate * duration)
+        audio = np.zeros((num_samples, 1), dtype='float32')
+        # Read a tenth of a second at a time.
+        block_size = self.sample_rate // 10
+        recorded = 0
+        with sd.InputStream(samplerate=self.sample_rate, channels=1, dtype='float32',
+                            device=input_device_index) as stream:
+            while recorded < num_samples and not (cancelled is not None and cancelled()):
+                count = min(block_size, num_samples - recorded)
+                block, _ = stream.read(count)
+                audio[recorded:recorded + count] = block
+                recorded += count
+                if self.scope is not None:
+                    self.scope.feed(block)
+                if on_progress is not None:
+                    on_progress(recorded / num_samples)
+        # Keep only the part that was recorded, as a view without copying it.
+        self.audio = AudioBuffer(audio[:recorded], self.sample_rate)
+        return recorded / self.sample_rate
+
+    def listen(self, on_text, input_device_index=None):
+        # Start decoding the input device in real time, without a fixed duration.
+        # Decoded characters are passed to on_text as soon as each character is complete.
+        # Call stop() on the returned object to end the monitoring.
+        from .live import LiveMorseDecoder
+        live_decoder = LiveMorseDecoder(on_text, self.sample_rate, input_device_index, metrics=self.metrics,
+                                        scope=self.scope)
+        live_decoder.start()
+        return live_decoder
+
+    def monitor(self, directory, input_device_index=None):
+        # Record the input device without a time limit, for unattended monitoring.
+        # The audio goes through a fixed-size memory-mapped ring buffer into segment files in the directory,
+        # so memory stays constant however long the capture runs. The last seconds can be decoded with
+        # decode(capture.latest(seconds)) while the capture goes on; call close() on the returned object to end it.
+        from .capture import ContinuousCapture
+        capture = ContinuousCapture(directory, self.sample_rate, device=input_device_index)
+        capture.start()
+        return capture
+
+    def save_audio(self, filename):
+        # Save the recorded audio to a file with the specified filename and sample rate.
+        import soundfile as sf
+        sf.write(filename, self.audio.samples, self.sample_rate)
+
+    def decode_audio_file(self, audio_file, on_text=None, on_progress=None, cancelled=None):
+        # Decode an audio file block by block with the chunked file decoder.
+        # The file is never loaded as a whole, so memory stays constant however long the recording is.
+        # Each piece of text is passed to on_text as soon as it is decoded, the fraction of the file
+        # decoded to on_progress, and the decoding stops early once cancelled() is true.
+        # The estimated sending speed of the file is kept in the wpm attribute.
+        stats = {}
+        pieces = []
+        if self.use_cache:
+            from .cache import DecodeCache, iter_decode_file_cached
+            with DecodeCache(self.cache_path) as cache:
+                self._collect(iter_decode_file_cached(audio_file, cache, pitch=self.pitch, threshold=self.threshold,
+                                                      wpm=self.fixed_wpm, stats=stats, progress=on_progress,
+                                                      metrics=self.metrics, cancelled=cancelled),
+                              pieces, on_text, cancelled)
+        else:
+            from .files import iter_decode_file
+            self._collect(iter_decode_file(audio_file, pitch=self.pitch, stats=stats, progress=on_progress,
+                                           metrics=self.metrics, threshold=self.threshold, wpm=self.fixed_wpm,
+                                           cancelled=cancelled), pieces, on_text, cancelled)
+        self.wpm = stats.get('wpm')
+        # Return the decoded text, without the word break emitted for the final silence.
+        return ''.join(pieces).strip()
+
+    def _collect(self, texts, pieces, on_text, cancelled):
+        # Gather the pieces of text of a decoder generator, passing each one to on_text,
+        # until the generator ends or cancelled() is true; a cancelled generator is closed at once.
+        # The generator is given cancelled() too and tests it after every block, so that a recording
+        # that yields no text, such as noise, still stops at the next block.
+        for text in texts:
+            pieces.append(text)
+            if on_text is not None:
+                on_text(text)
+            if cancelled is not None and cancelled():
+                texts.close()
+                break
+
+    def encode_text(self, text, wpm=20, pitch=700):
+        # Synthesize the CW audio of a text at the given speed and pitch.
+        # The audio replaces the recorded audio, so it can be decoded, played back or saved like a recording.
+        from .buffer import AudioBuffer
+        from .synth import encode_to_audio
+        self.audio = AudioBuffer(encode_to_audio(text, wpm, pitch, self.sample_rate), self.sample_rate)
+
+    def play_audio(self, audio_data):
+        # Play audio using the pygame mixer, which is initialized on the first playback.
+        # The audio is handed to the mixer as a buffer of 16-bit PCM frames in the mixer's channel layout,
+        # converted once and kept by the AudioBuffer, without going through a file.
+        import pygame
+        from .buffer import AudioBuffer
+        if not self.mixer_ready:
+            # Ask for the format of the recordings (16-bit mono at the sample rate),
+            # so that they can be played without conversion.
+            pygame.mixer.init(frequency=self.sample_rate, size=-16, channels=1)
+            self.mixer_ready = True
+        if not isinstance(audio_data, AudioBuffer):
+            audio_data = AudioBuffer(audio_data, self.sample_rate)
+        _, _, channels = pygame.mixer.get_init()
+        pygame.mixer.Sound(buffer=audio_data.pcm16(channels)).play()
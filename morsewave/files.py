@@ -0,0 +1,80 @@
+# Memory-bounded decoding and hashing of audio files.
+import hashlib
+
+import numpy as np
+
+from .channelizer import Channelizer
+from .decoder import StreamingMorseDecoder
+
+# Number of frames read from a file at a time (about 1.5 seconds at 44.1 kHz).
+FILE_BLOCK_SIZE = 65536
+# Number of bytes hashed at a time when computing a file digest.
+HASH_CHUNK_SIZE = 1 << 20
+# File extensions of the audio formats that can be decoded.
+AUDIO_EXTENSIONS = ('.wav', '.flac', '.ogg', '.aif', '.aiff')
+
+
+def read_blocks(sound_file, block_size=FILE_BLOCK_SIZE):
+    # Yield the frames of an open SoundFile as float32 blocks read into one reusable buffer.
+    if sound_file.channels > 1:
+        buffer = np.empty((block_size, sound_file.channels), dtype=np.float32)
+    else:
+        buffer = np.empty(block_size, dtype=np.float32)
+    return sound_file.blocks(dtype='float32', out=buffer)
+
+
+def iter_decode_file(audio_file, block_size=FILE_BLOCK_SIZE, pitch=None, stats=None, progress=None, metrics=None,
+                     threshold=None, wpm=None, cancelled=None):
+    # Decode an audio file block by block and yield the text as soon as it is decoded.
+    # The file is read as float32 into one reusable block buffer and the decoder state is carried
+    # across block boundaries, so peak memory does not depend on the length of the file.
+    # When a stats dictionary is given, the duration, pitch and final sending speed are stored in it.
+    # progress, when given, is called after every block with the fraction of the file decoded,
+    # and metrics, a DecodeMetrics, receives the stage timings and counters of every block.
+    # The decoding stops after the block once cancelled() is true, leaving stats untouched.
+    # threshold and wpm are the keying threshold position and fixed sending speed of decode_samples().
+    # soundfile is imported here so that the decoder engine can be used without it.
+    import soundfile as sf
+    with sf.SoundFile(audio_file) as sound_file:
+        decoder = StreamingMorseDecoder(sound_file.samplerate, pitch, metrics=metrics, threshold=threshold, wpm=wpm)
+        frames = 0
+        for block in read_blocks(sound_file, block_size):
+            text = decoder.feed(block)
+            frames += len(block)
+            if progress is not None and sound_file.frames > 0:
+                progress(min(frames / sound_file.frames, 1.0))
+            if text:
+                yield text
+            if cancelled is not None and cancelled():
+                return
+    text = decoder.flush()
+    if stats is not None:
+        stats['duration'] = sound_file.frames / sound_file.samplerate
+        stats['pitch'] = decoder.detector.pitch
+        stats['wpm'] = round(decoder.wpm, 1)
+    if text:
+        yield text
+
+
+def iter_decode_file_channels(audio_file, block_size=FILE_BLOCK_SIZE):
+    # Decode every CW carrier of a wideband audio file block by block.
+    # Yields dictionaries mapping the frequency of each channel to its newly decoded text.
+    import soundfile as sf
+    with sf.SoundFile(audio_file) as sound_file:
+        channelizer = Channelizer(sound_file.samplerate)
+        for block in read_blocks(sound_file, block_size):
+            texts = channelizer.feed(block)
+            if texts:
+                yield texts
+    texts = channelizer.flush()
+    if texts:
+        yield texts
+
+
+def file_digest(path, chunk_size=HASH_CHUNK_SIZE):
+    # Return the BLAKE2b digest of a file's content, read in fixed-size chunks.
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as stream:
+        for chunk in iter(lambda: stream.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
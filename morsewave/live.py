@@ -0,0 +1,98 @@
+# Real-time decoding of a sound card input stream.
+import threading
+import time
+
+from .decoder import StreamingMorseDecoder
+from .ringbuffer import RingBuffer
+
+# Number of samples delivered by each input stream callback (about 23 ms at 44.1 kHz).
+BLOCK_SIZE = 1024
+# Seconds of audio the ring buffer can hold when the decoding thread falls behind.
+BUFFER_SECONDS = 2.0
+# Seconds the decoding thread waits when the ring buffer is empty.
+POLL_INTERVAL = 0.01
+
+
+class LiveMorseDecoder:
+    # Decodes a sounddevice InputStream in real time.
+    # The stream callback only copies samples into a ring buffer; a separate thread feeds them to a
+    # StreamingMorseDecoder and passes every decoded piece of text to on_text as soon as it is complete.
+    # metrics, a DecodeMetrics, also times the stream callback and counts the samples it had to drop,
+    # and scope, a ScopeBuffer, receives the samples from the decoding thread for a live display.
+    def __init__(self, on_text, sample_rate=44100, device=None, block_size=BLOCK_SIZE,
+                 buffer_seconds=BUFFER_SECONDS, pitch=None, metrics=None, scope=None):
+        self.on_text = on_text
+        self.sample_rate = sample_rate
+        self.device = device
+        self.block_size = block_size
+        self.metrics = metrics
+        self.scope = scope
+        self.decoder = StreamingMorseDecoder(sample_rate, pitch, metrics=metrics)
+        self.ring = RingBuffer(sample_rate * buffer_seconds)
+        # Dropped samples already added to the metrics.
+        self.reported_dropped = 0
+        self.stream = None
+        self.thread = None
+        self.stopping = threading.Event()
+
+    @property
+    def wpm(self):
+        # Current estimate of the sending speed in words per minute.
+        return self.decoder.wpm
+
+    def start(self):
+        # Open the input stream and start the decoding thread.
+        # sounddevice is imported here so that the decoder engine can be used without audio hardware.
+        import sounddevice as sd
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.stream = sd.InputStream(samplerate=self.sample_rate, blocksize=self.block_size, channels=1,
+                                     dtype='float32', device=self.device, callback=self._callback)
+        self.stream.start()
+
+    def stop(self):
+        # Close the input stream, decode what is left in the ring buffer and flush the decoder.
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self._count_dropped()
+        self._emit(self.decoder.feed(self.ring.read()) + self.decoder.flush())
+
+    def _callback(self, indata, frames, time_info, status):
+        # Input stream callback: copy the first channel into the ring buffer.
+        if self.metrics is None:
+            self.ring.write(indata[:, 0])
+            return
+        start = time.perf_counter()
+        self.ring.write(indata[:, 0])
+        self.metrics.add_time('capture', start)
+
+    def _run(self):
+        # Decoding thread: feed the buffered samples to the decoder until the stream is stopped.
+        while not self.stopping.is_set():
+            if self.ring.available():
+                self._count_dropped()
+                samples = self.ring.read()
+                if self.scope is not None:
+                    self.scope.feed(samples)
+                self._emit(self.decoder.feed(samples))
+            else:
+                self.stopping.wait(POLL_INTERVAL)
+
+    def _count_dropped(self):
+        # Add the samples dropped by the ring buffer since the last call to the metrics.
+        if self.metrics is not None:
+            dropped = self.ring.dropped
+            self.metrics.count('dropped_samples', dropped - self.reported_dropped)
+            self.reported_dropped = dropped
+
+    def _emit(self, text):
+        # Pass decoded text to the callback.
+        if text:
+            self.on_text(text)
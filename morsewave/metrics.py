@@ -0,0 +1,113 @@
+# Optional instrumentation of the decoder: per-stage timers, counters and gauges.
+# Decoders take a DecodeMetrics instance or None. With None, the default, every instrumented spot costs
+# a single "is not None" test per call or block, never per sample, so decoding without metrics runs at
+# full speed.
+import math
+import time
+
+# Counters kept by every DecodeMetrics, with their help text for the Prometheus dump.
+COUNTERS = {
+    'samples': 'Audio samples decoded.',
+    'dropped_samples': 'Captured samples dropped because decoding fell behind.',
+    'runs': 'Key-down and key-up runs found in the envelope.',
+    'symbols': 'Symbols looked up in the code table.',
+    'unknown_symbols': 'Symbols with no character in the code table, decoded as "?".',
+}
+# Gauges, with their help text; a gauge is None until it has been measured.
+GAUGES = {
+    'wpm': 'Estimated sending speed in words per minute.',
+    'snr_db': 'Carrier to noise floor ratio of the envelope in dB.',
+}
+# Decoding stages that are timed, in processing order.
+STAGES = ('capture', 'envelope', 'threshold', 'runs', 'timing', 'search', 'symbols', 'text')
+
+
+def level_ratio_db(noise, carrier):
+    # Return the ratio of two envelope levels in dB, or None when it cannot be measured.
+    if noise is None or carrier is None or carrier <= 0:
+        return None
+    return 20 * math.log10(carrier / max(noise, carrier * 1e-6))
+
+
+class DecodeMetrics:
+    # Counters, gauges and cumulative stage timers of one or more decodes.
+    # Listeners added with add_listener() are called with the metrics after every decoded block or
+    # recording, so they can be forwarded to a monitoring system as the decoding goes on.
+    def __init__(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.gauges = dict.fromkeys(GAUGES)
+        # Total seconds spent in each stage and the number of times it ran.
+        self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self.stage_calls = dict.fromkeys(STAGES, 0)
+        self.listeners = []
+
+    def add_listener(self, listener):
+        # Call listener(metrics) every time the metrics are published.
+        self.listeners.append(listener)
+
+    def count(self, name, value=1):
+        self.counters[name] += int(value)
+
+    def set(self, name, value):
+        self.gauges[name] = None if value is None else float(value)
+
+    def add_time(self, stage, start):
+        # Add the time since start, a time.perf_counter() value, to a stage; return the current time
+        # so that consecutive stages can be timed with one clock reading each.
+        now = time.perf_counter()
+        self.stage_seconds[stage] += now - start
+        self.stage_calls[stage] += 1
+        return now
+
+    def publish(self):
+        # Pass the metrics to the listeners.
+        for listener in self.listeners:
+            listener(self)
+
+    def merge(self, other):
+        # Add the counters and stage timers of another DecodeMetrics, and take its measured gauges.
+        for name, value in other.counters.items():
+            self.counters[name] += value
+        for name, value in other.gauges.items():
+            if value is not None:
+                self.gauges[name] = value
+        for stage in STAGES:
+            self.stage_seconds[stage] += other.stage_seconds[stage]
+            self.stage_calls[stage] += other.stage_calls[stage]
+
+    def snapshot(self):
+        # Return the metrics as a dictionary of plain values, for JSON records and listeners.
+        return {
+            'counters': dict(self.counters),
+            'gauges': dict(self.gauges),
+            'stage_seconds': {stage: round(seconds, 6) for stage, seconds in self.stage_seconds.items()},
+            'stage_calls': dict(self.stage_calls),
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        # Rebuild metrics from snapshot(), for instance to aggregate the results of worker processes.
+        metrics = cls()
+        metrics.counters.update(snapshot['counters'])
+        metrics.gauges.update(snapshot['gauges'])
+        metrics.stage_seconds.update(snapshot['stage_seconds'])
+        metrics.stage_calls.update(snapshot['stage_calls'])
+        return metrics
+
+    def to_prometheus(self, prefix='morsewave'):
+        # Return the metrics in the Prometheus text exposition format.
+        lines = []
+        for name, help_text in COUNTERS.items():
+            lines += [f"# HELP {prefix}_{name}_total {help_text}", f"# TYPE {prefix}_{name}_total counter",
+                      f"{prefix}_{name}_total {self.counters[name]}"]
+        for name, help_text in GAUGES.items():
+            if self.gauges[name] is not None:
+                lines += [f"# HELP {prefix}_{name} {help_text}", f"# TYPE {prefix}_{name} gauge",
+                          f"{prefix}_{name} {self.gauges[name]:.6g}"]
+        lines += [f"# HELP {prefix}_stage_seconds_total Time spent in each decoding stage.",
+                  f"# TYPE {prefix}_stage_seconds_total counter"]
+        lines += [f'{prefix}_stage_seconds_total{{stage="{stage}"}} {self.stage_seconds[stage]:.6f}' for stage in STAGES]
+        lines += [f"# HELP {prefix}_stage_calls_total Number of times each decoding stage ran.",
+                  f"# TYPE {prefix}_stage_calls_total counter"]
+        lines += [f'{prefix}_stage_calls_total{{stage="{stage}"}} {self.stage_calls[stage]}' for stage in STAGES]
+        return '\n'.join(lines) + '\n'
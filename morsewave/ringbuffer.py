@@ -0,0 +1,43 @@
+# Fixed-size sample ring buffer between an audio callback and a decoding thread.
+import numpy as np
+
+
+class RingBuffer:
+    # Lock-free single-producer, single-consumer ring buffer of float32 samples.
+    # The producer only ever advances write_count and the consumer only ever advances read_count,
+    # and each counter is published after the samples it covers, so no lock is needed.
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.buffer = np.zeros(self.capacity, dtype=np.float32)
+        # Total number of samples written and read since the buffer was created.
+        self.write_count = 0
+        self.read_count = 0
+        # Number of samples dropped because the consumer fell behind.
+        self.dropped = 0
+
+    def available(self):
+        # Return the number of samples waiting to be read.
+        return self.write_count - self.read_count
+
+    def write(self, samples):
+        # Copy samples into the buffer; samples that do not fit are dropped and counted.
+        # This is called from the audio callback, so it never blocks and never allocates.
+        free = self.capacity - self.available()
+        count = min(len(samples), free)
+        self.dropped += len(samples) - count
+        start = self.write_count % self.capacity
+        first = min(count, self.capacity - start)
+        self.buffer[start:start + first] = samples[:first]
+        self.buffer[:count - first] = samples[first:count]
+        self.write_count += count
+
+    def read(self, max_samples=None):
+        # Copy out and return the samples waiting to be read, up to max_samples of them.
+        count = self.available()
+        if max_samples is not None:
+            count = min(count, max_samples)
+        start = self.read_count % self.capacity
+        first = min(count, self.capacity - start)
+        samples = np.concatenate((self.buffer[start:start + first], self.buffer[:count - first]))
+        self.read_count += count
+        return samples
@@ -0,0 +1,141 @@
+# Display buffers of the live envelope and waterfall panel.
+# Captured audio is reduced as it arrives to fixed-rate columns: the minimum and maximum sample of each
+# column and the spectrum of a short-time Fourier transform ending at it. Columns go into a ring buffer
+# holding the last minutes, so drawing a frame only reads the columns on screen and decimates them to
+# the widget width: the cost of a redraw depends on the widget size, never on how long the capture ran.
+import numpy as np
+
+from .dsp import to_mono
+
+# Columns computed per second of audio.
+COLUMN_RATE = 100
+# Seconds of columns kept in the ring buffer.
+HISTORY_SECONDS = 600.0
+# Length of the STFT window in samples; the hop between windows is one column.
+FFT_SIZE = 1024
+# Highest frequency shown by the waterfall, in Hz; CW pitches are well below it.
+MAX_FREQUENCY = 3000.0
+# Levels mapped to the darkest and the brightest waterfall colour, in dB relative to full scale.
+WATERFALL_FLOOR = -100.0
+WATERFALL_CEILING = -10.0
+# Waterfall colour map from the lowest to the highest level, as RGB stops.
+WATERFALL_COLORS = ((0, 0, 0), (0, 0, 140), (0, 160, 200), (240, 220, 0), (255, 255, 255))
+# Smallest peak amplitude the envelope is scaled to, so that silence is not amplified into noise.
+MIN_ENVELOPE_SCALE = 1e-3
+
+
+def _color_table():
+    # Build a 256-entry BGRA lookup table (the byte order of a Qt ARGB32 image) from WATERFALL_COLORS.
+    stops = np.linspace(0, 255, len(WATERFALL_COLORS))
+    levels = np.arange(256)
+    table = np.full((256, 4), 255, dtype=np.uint8)
+    for channel in range(3):
+        table[:, 2 - channel] = np.interp(levels, stops, [color[channel] for color in WATERFALL_COLORS])
+    return table
+
+
+COLOR_TABLE = _color_table()
+
+
+def decimate(columns, width, reduce):
+    # Reduce a run of columns to at most width columns, combining each group with reduce (np.minimum or
+    # np.maximum) so that short peaks stay visible however many columns fall on one pixel.
+    if len(columns) <= width:
+        return columns
+    starts = np.arange(width) * len(columns) // width
+    return reduce.reduceat(columns, starts, axis=0)
+
+
+class ScopeBuffer:
+    # Incremental STFT and min/max reduction of an audio stream into a ring of display columns.
+    # feed() is called by the thread capturing the audio and the drawing methods by the GUI thread.
+    # write_count is published after the columns it covers, so the GUI never reads unfinished columns.
+    def __init__(self, sample_rate, column_rate=COLUMN_RATE, history_seconds=HISTORY_SECONDS, fft_size=FFT_SIZE,
+                 max_frequency=MAX_FREQUENCY):
+        self.sample_rate = sample_rate
+        # Samples per column, and the resulting column rate.
+        self.hop = max(1, int(round(sample_rate / column_rate)))
+        self.column_rate = sample_rate / self.hop
+        self.fft_size = max(fft_size, self.hop)
+        self.window = np.hanning(self.fft_size).astype(np.float32)
+        # Scale of the spectrum magnitude to the amplitude of a sine wave.
+        self.scale = 2.0 / self.window.sum()
+        self.bins = min(self.fft_size // 2 + 1, int(max_frequency * self.fft_size / sample_rate) + 1)
+        self.capacity = max(1, int(history_seconds * self.column_rate))
+        self.minima = np.zeros(self.capacity, dtype=np.float32)
+        self.maxima = np.zeros(self.capacity, dtype=np.float32)
+        # Waterfall levels from 0 (WATERFALL_FLOOR) to 255 (WATERFALL_CEILING).
+        self.spectra = np.zeros((self.capacity, self.bins), dtype=np.uint8)
+        # Samples of the last windows that overlap the next one, and samples short of a full column.
+        self.history = np.zeros(self.fft_size - self.hop, dtype=np.float32)
+        self.pending = np.zeros(0, dtype=np.float32)
+        # Total number of columns computed since the buffer was created.
+        self.write_count = 0
+
+    def feed(self, samples):
+        # Add a block of audio, computing the columns it completes.
+        joined = np.concatenate((self.pending, to_mono(samples)))
+        count = joined.size // self.hop
+        self.pending = joined[count * self.hop:]
+        if count == 0:
+            return
+        frames = joined[:count * self.hop]
+        hops = frames.reshape(count, self.hop)
+        # Every column's STFT window ends with the column's own samples.
+        context = np.concatenate((self.history, frames))
+        windows = np.lib.stride_tricks.sliding_window_view(context, self.fft_size)[::self.hop]
+        magnitude = np.abs(np.fft.rfft(windows * self.window, axis=1)[:, :self.bins]) * self.scale
+        levels = 20 * np.log10(magnitude + 1e-10)
+        levels = (levels - WATERFALL_FLOOR) * (255 / (WATERFALL_CEILING - WATERFALL_FLOOR))
+        self.history = context[context.size - self.history.size:]
+        self._store(hops.min(axis=1), hops.max(axis=1), np.clip(levels, 0, 255).astype(np.uint8))
+
+    def latest(self, count):
+        # Return copies of the minima, maxima and spectra of the most recent count columns, oldest first.
+        end = self.write_count
+        count = min(int(count), end, self.capacity)
+        positions = np.arange(end - count, end) % self.capacity
+        return self.minima[positions], self.maxima[positions], self.spectra[positions]
+
+    def envelope_image(self, width, height, seconds):
+        # Draw the envelope of the last seconds, decimated to width columns, as a (height, width, 4) BGRA image.
+        # Every pixel column spans the lowest to the highest sample that fell on it, scaled to the loudest
+        # column on screen; the most recent audio is at the right edge.
+        minima, maxima, _ = self.latest(seconds * self.column_rate)
+        minima = decimate(minima, width, np.minimum)
+        maxima = decimate(maxima, width, np.maximum)
+        image = np.zeros((height, width, 4), dtype=np.uint8)
+        image[..., 3] = 255
+        if minima.size == 0 or height < 2:
+            return image
+        scale = max(float(np.abs(minima).max()), float(np.abs(maxima).max()), MIN_ENVELOPE_SCALE)
+        # Row 0 is the top of the image, where the positive peaks are.
+        top = np.round((1 - maxima / scale) * (height - 1) / 2).astype(np.intp)
+        bottom = np.round((1 - minima / scale) * (height - 1) / 2).astype(np.intp)
+        rows = np.arange(height)[:, None]
+        mask = (rows >= top) & (rows <= bottom)
+        image[:, width - minima.size:][mask] = (0, 220, 0, 255)
+        return image
+
+    def waterfall_image(self, width, height, seconds):
+        # Draw the spectra of the last seconds, decimated to width columns, as a (height, width, 4) BGRA image.
+        # Time runs from left to right and frequency from the bottom up to MAX_FREQUENCY.
+        _, _, spectra = self.latest(seconds * self.column_rate)
+        spectra = decimate(spectra, width, np.maximum)
+        image = np.zeros((height, width, 4), dtype=np.uint8)
+        image[..., 3] = 255
+        if len(spectra) == 0 or height < 1:
+            return image
+        bins = (height - 1 - np.arange(height)) * self.bins // height
+        image[:, width - len(spectra):] = COLOR_TABLE[spectra[:, bins].T]
+        return image
+
+    def _store(self, minima, maxima, spectra):
+        # Write computed columns into the ring, keeping only the last capacity of a larger batch.
+        count = len(minima)
+        skipped = max(0, count - self.capacity)
+        positions = np.arange(self.write_count + skipped, self.write_count + count) % self.capacity
+        self.minima[positions] = minima[skipped:]
+        self.maxima[positions] = maxima[skipped:]
+        self.spectra[positions] = spectra[skipped:]
+        self.write_count += count
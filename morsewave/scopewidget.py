@@ -0,0 +1,55 @@
+# Qt widget showing the live envelope and waterfall of a ScopeBuffer.
+# The images are drawn by the ScopeBuffer from the columns on screen only, and the widget repaints on a
+# timer at FRAME_RATE, and only when new columns have arrived, so the panel costs nothing while idle.
+# This module needs PyQt5 and is only imported by the graphical front-ends, never by the engine.
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+# Highest number of repaints per second.
+FRAME_RATE = 30
+# Seconds of audio across the width of the panel.
+DISPLAY_SECONDS = 10.0
+# Fraction of the height given to the envelope, above the waterfall.
+ENVELOPE_FRACTION = 0.35
+
+
+class ScopeWidget(QtWidgets.QWidget):
+    def __init__(self, parent=None, seconds=DISPLAY_SECONDS):
+        super().__init__(parent)
+        self.seconds = seconds
+        # ScopeBuffer drawn by the widget, and its column count at the last repaint.
+        self.scope = None
+        self.drawn_count = 0
+        self.setMinimumHeight(120)
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000 // FRAME_RATE)
+
+    def set_scope(self, scope):
+        # Show another ScopeBuffer, or nothing with None.
+        self.scope = scope
+        self.drawn_count = 0
+        self.update()
+
+    def refresh(self):
+        # Timer slot: ask for a repaint when the scope has new columns.
+        if self.scope is not None and self.scope.write_count != self.drawn_count:
+            self.update()
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        width, height = self.width(), self.height()
+        if self.scope is None or width < 1 or height < 2:
+            painter.fillRect(self.rect(), QtCore.Qt.black)
+            return
+        self.drawn_count = self.scope.write_count
+        envelope_height = max(1, int(height * ENVELOPE_FRACTION))
+        envelope = self.scope.envelope_image(width, envelope_height, self.seconds)
+        waterfall = self.scope.waterfall_image(width, height - envelope_height, self.seconds)
+        # The arrays must outlive the QImages wrapping them, which they do until the end of the paint.
+        painter.drawImage(0, 0, self._image(envelope))
+        painter.drawImage(0, envelope_height, self._image(waterfall))
+
+    def _image(self, pixels):
+        # Wrap a (height, width, 4) BGRA array in a QImage without copying it.
+        height, width, _ = pixels.shape
+        return QtGui.QImage(pixels.data, width, height, pixels.strides[0], QtGui.QImage.Format_ARGB32)
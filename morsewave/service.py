@@ -0,0 +1,236 @@
+# Headless decoding service: clients stream PCM audio over a local TCP connection and receive the
+# decoded text as soon as each character is complete.
+#
+# Protocol, per connection:
+#   1. The client sends one JSON line with the stream parameters, for example
+#      {"sample_rate": 8000, "format": "int16"}; "format" is "int16" (default) or "float32",
+#      both little-endian mono, and an optional "pitch" in Hz skips the pitch search.
+#   2. The client sends raw PCM frames, in chunks of any size, and half-closes the connection at the end.
+#   3. The server sends JSON lines: {"text": "..."} for every piece of decoded text, then
+#      {"end": true, "wpm": ..., "seconds": ...} once the stream is complete, or {"error": "..."}.
+# A connection whose header is {"metrics": true} sends no audio; the server answers with one line
+# {"metrics": "..."} holding the decoding metrics of all the finished streams in the Prometheus text format.
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .decoder import StreamingMorseDecoder
+from .metrics import DecodeMetrics
+
+# Default address of the service; it only listens on the local host unless told otherwise.
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 7355
+# Number of bytes read from a connection at a time.
+READ_SIZE = 16384
+# Chunks queued per connection before the service stops reading from it, which makes the TCP window
+# close and slows the client down instead of buffering its audio without limit.
+QUEUE_CHUNKS = 16
+# Connections served at the same time; further clients are refused.
+MAX_CONNECTIONS = 512
+# Sample formats accepted from clients and their scale to the -1..1 range.
+SAMPLE_FORMATS = {'int16': (np.dtype('<i2'), 1 / 32768), 'float32': (np.dtype('<f4'), 1.0)}
+
+
+class StreamSession:
+    # Decoding state of one connection: the decoder and the bytes of an incomplete frame.
+    # metrics, a DecodeMetrics, instruments the decoder of the connection.
+    def __init__(self, sample_rate, sample_format='int16', pitch=None, metrics=None):
+        if sample_format not in SAMPLE_FORMATS:
+            raise ValueError(f"Unknown sample format {sample_format!r}.")
+        if sample_rate <= 0:
+            raise ValueError("The sample rate must be positive.")
+        self.dtype, self.scale = SAMPLE_FORMATS[sample_format]
+        self.metrics = metrics
+        self.decoder = StreamingMorseDecoder(sample_rate, pitch, metrics=metrics)
+        self.sample_rate = sample_rate
+        self.remainder = b''
+        self.frames = 0
+
+    def feed(self, data):
+        # Decode a chunk of PCM bytes and return the text completed by it. Runs on the executor.
+        data = self.remainder + data
+        usable = len(data) - len(data) % self.dtype.itemsize
+        self.remainder = data[usable:]
+        samples = np.frombuffer(data, dtype=self.dtype, count=usable // self.dtype.itemsize)
+        self.frames += samples.size
+        return self.decoder.feed(samples.astype(np.float32) * np.float32(self.scale))
+
+    def flush(self):
+        # End the stream and return the text still pending. Runs on the executor.
+        return self.decoder.flush()
+
+
+class DecodeService:
+    # asyncio TCP server giving every connection its own StreamSession.
+    # The event loop only moves bytes: each connection has a reader task filling a bounded queue and a
+    # decoding task that hands the queued audio to a thread pool, so DSP work never stalls the loop and a
+    # slow decoder holds back its own client only. NumPy releases the GIL in its inner loops, so the pool
+    # decodes several streams in parallel.
+    # With collect_metrics, every connection is instrumented and its metrics are added to self.metrics
+    # once its stream ends.
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, max_workers=None, queue_chunks=QUEUE_CHUNKS,
+                 max_connections=MAX_CONNECTIONS, collect_metrics=True):
+        self.host = host
+        self.port = port
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.queue_chunks = queue_chunks
+        self.max_connections = max_connections
+        self.executor = None
+        self.server = None
+        self.connections = 0
+        self.metrics = DecodeMetrics() if collect_metrics else None
+
+    async def start(self):
+        # Start listening; with port 0 a free port is chosen and stored in self.port.
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='morsewave-decode')
+        self.server = await asyncio.start_server(self.handle, self.host, self.port,
+                                                 backlog=self.max_connections)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        # Start the service if needed and serve until cancelled.
+        if self.server is None:
+            await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        # Stop listening and shut the thread pool down.
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    async def handle(self, reader, writer):
+        # Serve one connection from its header line to the end of its audio.
+        loop = asyncio.get_running_loop()
+        if self.connections >= self.max_connections:
+            await self._send(writer, {'error': 'Too many connections.'})
+            writer.close()
+            return
+        self.connections += 1
+        try:
+            try:
+                header = json.loads(await reader.readline())
+                if header.get('metrics'):
+                    await self._send_metrics(writer)
+                    return
+                session = StreamSession(int(header.get('sample_rate', 0)), header.get('format', 'int16'),
+                                        header.get('pitch'), None if self.metrics is None else DecodeMetrics())
+            except (ValueError, TypeError, AttributeError) as e:
+                await self._send(writer, {'error': f"Invalid header: {e}"})
+                return
+            queue = asyncio.Queue(maxsize=self.queue_chunks)
+            read_task = asyncio.ensure_future(self._read(reader, queue))
+            try:
+                while True:
+                    # Decode everything queued in one executor call, which keeps the per-call overhead
+                    # low when a client sends many small chunks.
+                    chunks = [await queue.get()]
+                    while not queue.empty() and chunks[-1] is not None:
+                        chunks.append(queue.get_nowait())
+                    ended = chunks[-1] is None
+                    data = b''.join(chunk for chunk in chunks if chunk is not None)
+                    text = await loop.run_in_executor(self.executor, session.feed, data) if data else ''
+                    if ended:
+                        text += await loop.run_in_executor(self.executor, session.flush)
+                    if text:
+                        await self._send(writer, {'text': text})
+                    if ended:
+                        break
+            finally:
+                read_task.cancel()
+                if session.metrics is not None:
+                    self.metrics.merge(session.metrics)
+            await self._send(writer, {'end': True, 'wpm': round(session.decoder.wpm, 1),
+                                      'seconds': round(session.frames / session.sample_rate, 3)})
+        except ConnectionError:
+            pass
+        except Exception as e:
+            # Report decoding errors to the client instead of dropping the connection silently.
+            try:
+                await self._send(writer, {'error': str(e)})
+            except ConnectionError:
+                pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def _read(self, reader, queue):
+        # Move the audio of a connection into its queue, waiting while the queue is full; None marks the end.
+        while True:
+            data = await reader.read(READ_SIZE)
+            await queue.put(data or None)
+            if not data:
+                return
+
+    async def _send_metrics(self, writer):
+        # Answer a metrics request.
+        if self.metrics is None:
+            await self._send(writer, {'error': 'Metrics are not collected by this service.'})
+        else:
+            await self._send(writer, {'metrics': self.metrics.to_prometheus()})
+
+    async def _send(self, writer, message):
+        # Send one JSON line and wait until the transport can take more, so slow readers are not buffered for.
+        writer.write(json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n')
+        await writer.drain()
+
+
+async def decode_stream(samples, sample_rate, host=DEFAULT_HOST, port=DEFAULT_PORT, chunk_frames=4096, on_text=None):
+    # Client side of the protocol: stream float samples to a service as int16 and return the decoded text.
+    # on_text, when given, is called with every piece of text as it arrives.
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(json.dumps({'sample_rate': sample_rate, 'format': 'int16'}).encode('utf-8') + b'\n')
+    pcm = (np.clip(np.asarray(samples, dtype=np.float32), -1.0, 1.0) * 32767).astype('<i2')
+
+    async def send():
+        for start in range(0, pcm.size, chunk_frames):
+            writer.write(pcm[start:start + chunk_frames].tobytes())
+            await writer.drain()
+        writer.write_eof()
+
+    send_task = asyncio.ensure_future(send())
+    pieces = []
+    try:
+        async for line in reader:
+            message = json.loads(line)
+            if 'error' in message:
+                raise RuntimeError(message['error'])
+            if 'text' in message:
+                pieces.append(message['text'])
+                if on_text is not None:
+                    on_text(message['text'])
+            if message.get('end'):
+                break
+        await send_task
+    finally:
+        send_task.cancel()
+        writer.close()
+    return ''.join(pieces)
+
+
+async def fetch_metrics(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    # Return the decoding metrics of a service in the Prometheus text format.
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(json.dumps({'metrics': True}).encode('utf-8') + b'\n')
+        message = json.loads(await reader.readline())
+    finally:
+        writer.close()
+    if 'error' in message:
+        raise RuntimeError(message['error'])
+    return message['metrics']
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, max_workers=None, collect_metrics=True):
+    # Run the service until interrupted.
+    asyncio.run(DecodeService(host, port, max_workers, collect_metrics=collect_metrics).serve_forever())
@@ -0,0 +1,332 @@
+# Soft-decision Morse decoder: a beam search over run lengths and the code trie.
+# Instead of keying the envelope against a threshold, every frame of the envelope gets a mark and a space
+# log-likelihood, and hypotheses about the whole sequence of runs are scored against them. A hypothesis is
+# a position in the code trie, the state and length of the current run and the last character decoded.
+# Runs are scored by how well their length fits a dot, a dash or a gap at the speed measured once for the
+# whole signal, characters by an optional bigram model, and only codes of the trie can be completed.
+# All the hypotheses of the beam advance together with one set of NumPy operations per frame, and the
+# search never loops over hypotheses in Python.
+import time
+
+import numpy as np
+
+from .codes import DECODE_TABLE, MAX_CODE_LENGTH, code_index
+from .dsp import GLITCH_DURATION, level_threshold, merge_short_runs, run_lengths, signal_levels, to_mono
+from .metrics import level_ratio_db
+from .synth import tokenize
+from .timing import DEFAULT_WPM
+from .tone import ToneDetector
+
+# Number of hypotheses kept after every frame.
+BEAM_WIDTH = 32
+# Envelope frames per dot length; every frame is one step of the search.
+FRAMES_PER_UNIT = 4
+# Spread of run lengths around their nominal length, on a log scale.
+DURATION_SIGMA = 0.25
+# Frames searched between two progress reports and checks for cancellation.
+PROGRESS_FRAMES = 256
+# Runs longer than this many dot lengths are all scored as this long.
+LONGEST_RUN = 10
+# Largest mark to space log-likelihood ratio of one frame, so that a burst of noise cannot decide alone.
+LLR_LIMIT = 8.0
+# Iterations of the two-level clustering that measures the mark and space levels of the frames.
+LEVEL_ITERATIONS = 8
+# Seconds around every frame over which the carrier level is measured, to follow fading.
+CARRIER_WINDOW = 2.0
+# Lowest carrier level around a frame, relative to the carrier level of the whole signal.
+CARRIER_FLOOR = 0.25
+# Length in seconds of the frames the speed is measured on.
+FINE_FRAME = 0.005
+# Shortest and longest dot lengths in seconds the speed is searched between (60 and 6 WPM), and the
+# number of lengths tried.
+UNIT_RANGE = (0.02, 0.2)
+UNIT_STEPS = 200
+# Ratio beyond which a mark counts as neither a dot nor a dash of the dot length being scored.
+MARK_TOLERANCE = 1.5
+
+# Characters the decoder can produce, and the index of the word break among them.
+VOCABULARY = sorted(set(DECODE_TABLE.values())) + [' ']
+SPACE = len(VOCABULARY) - 1
+# Code trie, indexed like SYMBOL_TABLE: the vocabulary index of the character of every node (-1 for none)
+# and whether a node lies on the path to at least one code.
+TRIE_SIZE = 1 << (MAX_CODE_LENGTH + 1)
+CHARACTER_INDEX = np.full(TRIE_SIZE, -1, dtype=np.int64)
+PREFIX = np.zeros(TRIE_SIZE, dtype=bool)
+for _code, _char in DECODE_TABLE.items():
+    _index = code_index(_code)
+    CHARACTER_INDEX[_index] = VOCABULARY.index(_char)
+    while _index:
+        PREFIX[_index] = True
+        _index >>= 1
+del _code, _char, _index
+
+
+def train_bigrams(text, smoothing=1.0):
+    # Return a character bigram model, as a (len(VOCABULARY), len(VOCABULARY)) array of log-probabilities
+    # of each character given the previous one, counted from a sample text with additive smoothing.
+    symbols = {char: index for index, char in enumerate(VOCABULARY)}
+    tokens = [symbols[token] for token in tokenize(text) if token in symbols]
+    counts = np.full((len(VOCABULARY), len(VOCABULARY)), float(smoothing))
+    np.add.at(counts, (tokens[:-1], tokens[1:]), 1)
+    return np.log(counts / counts.sum(axis=1, keepdims=True))
+
+
+def mean_frames(env, length):
+    # Average an envelope over consecutive frames of length values, dropping the incomplete last frame.
+    count = env.size // length
+    return env[:count * length].reshape(count, length).mean(axis=1, dtype=np.float64)
+
+
+def normalize_frames(frames, window):
+    # Divide the frames by the carrier level around them, the highest frame within window frames, so that
+    # slow fading does not move the marks towards the spaces. Long pauses are not scaled up into marks:
+    # the level never falls below CARRIER_FLOOR of the carrier level of the whole signal.
+    window = max(1, min(window, frames.size))
+    padded = np.pad(frames, (window // 2, window - window // 2 - 1), mode='edge')
+    carrier = np.lib.stride_tricks.sliding_window_view(padded, window).max(axis=1)
+    return frames / np.maximum(carrier, CARRIER_FLOOR * np.percentile(frames, 90) + 1e-12)
+
+
+def cluster_levels(frames):
+    # Cluster frames into two Gaussians, the spaces and the marks, and return their means and deviations.
+    low, high = np.percentile(frames, [10, 90])
+    for _ in range(LEVEL_ITERATIONS):
+        marks = frames > (low + high) / 2
+        if marks.all() or not marks.any():
+            break
+        low, high = frames[~marks].mean(), frames[marks].mean()
+    marks = frames > (low + high) / 2
+    floor = 0.05 * (high - low) + 1e-12
+    low_sd = max(frames[~marks].std(), floor) if not marks.all() else floor
+    high_sd = max(frames[marks].std(), floor) if marks.any() else floor
+    return low, high, low_sd, high_sd
+
+
+def frame_likelihoods(frames):
+    # Return the mark and space log-likelihoods of every frame, as half the clipped log-likelihood ratio
+    # with opposite signs.
+    low, high, low_sd, high_sd = cluster_levels(frames)
+    ratio = (-0.5 * ((frames - high) / high_sd) ** 2 - np.log(high_sd)
+             + 0.5 * ((frames - low) / low_sd) ** 2 + np.log(low_sd))
+    ratio = np.clip(ratio, -LLR_LIMIT, LLR_LIMIT) / 2
+    return ratio, -ratio
+
+
+def duration_scores(units, frames_per_unit, longest):
+    # Return the log-score of runs of 0 to longest frames for a run nominally units dot lengths long.
+    lengths = np.maximum(np.arange(longest + 1), 1)
+    return -0.5 * ((np.log(lengths) - np.log(units * frames_per_unit)) / DURATION_SIGMA) ** 2
+
+
+def estimate_unit(env, rate):
+    # Measure the dot length of an envelope, in envelope values, from the marks of the envelope keyed at
+    # the middle of its normalized levels. Every dot length of UNIT_RANGE is scored by how far the marks
+    # lie from the nearest of a dot and a dash, each mark counting at most the distance to MARK_TOLERANCE,
+    # so that the fragments and bursts of a noisy signal cannot pull the speed the way they pull an online
+    # model such as TimingModel.
+    length = max(1, int(rate * FINE_FRAME))
+    frames = normalize_frames(mean_frames(env, length), int(CARRIER_WINDOW / FINE_FRAME))
+    units = np.geomspace(*UNIT_RANGE, num=UNIT_STEPS) * rate
+    if frames.size == 0:
+        return rate * 1.2 / DEFAULT_WPM
+    low, high, _, _ = cluster_levels(frames)
+    states, lengths = merge_short_runs(*run_lengths(frames > (low + high) / 2),
+                                       int(round(GLITCH_DURATION / FINE_FRAME)))
+    marks = lengths[states.astype(bool)] * length
+    marks = marks[marks >= units[0] / 2]
+    if marks.size == 0:
+        return rate * 1.2 / DEFAULT_WPM
+    logs = np.log(marks)
+    distance = np.minimum(np.abs(logs[None, :] - np.log(units)[:, None]),
+                          np.abs(logs[None, :] - np.log(units * 3)[:, None]))
+    cost = np.minimum(distance, np.log(MARK_TOLERANCE)) ** 2
+    # Marks weigh by their length, so that many short fragments of noise do not outweigh the dashes.
+    return float(units[np.argmin(cost @ marks)])
+
+
+def soft_decode_envelope(env, rate, beam_width=BEAM_WIDTH, bigrams=None, bigram_weight=1.0, wpm=None,
+                         metrics=None, progress=None, cancelled=None):
+    # Decode an envelope with the beam search and return the text.
+    # The speed is measured once for the whole envelope, unless wpm gives it; bigrams is a model from
+    # train_bigrams(), weighted by bigram_weight against the signal.
+    # Every PROGRESS_FRAMES frames, progress is called with the fraction of the frames searched, and the
+    # search stops once cancelled() is true, returning the text of the best hypothesis so far.
+    if metrics is not None:
+        start = time.perf_counter()
+    levels = signal_levels(env, stride=int(rate * 0.001))
+    if metrics is not None:
+        start = metrics.add_time('threshold', start)
+        metrics.set('snr_db', None if levels is None else level_ratio_db(*levels))
+    if levels is None or level_threshold(*levels) is None:
+        if metrics is not None:
+            metrics.publish()
+        return ""
+    unit = rate * 1.2 / wpm if wpm else estimate_unit(env, rate)
+    frame_length = max(1, int(round(unit / FRAMES_PER_UNIT)))
+    frames = mean_frames(env, frame_length)
+    if frames.size == 0:
+        if metrics is not None:
+            metrics.publish()
+        return ""
+    frames = normalize_frames(frames, int(CARRIER_WINDOW * rate / frame_length))
+    mark_scores, space_scores = frame_likelihoods(frames)
+    per_unit = unit / frame_length
+    longest = int(LONGEST_RUN * per_unit)
+    dot, dash = duration_scores(1, per_unit, longest), duration_scores(3, per_unit, longest)
+    element_gap, char_gap = duration_scores(1, per_unit, longest), duration_scores(3, per_unit, longest)
+    word_gap = duration_scores(7, per_unit, longest)
+    # Any pause longer than a word gap is a word gap.
+    word_gap[int(7 * per_unit):] = 0.0
+    if bigrams is None:
+        bigrams = np.zeros((len(VOCABULARY), len(VOCABULARY)))
+    bigrams = bigrams * bigram_weight
+    if metrics is not None:
+        start = metrics.add_time('timing', start)
+    search = _BeamSearch(beam_width, longest)
+    for index, (mark_score, space_score) in enumerate(zip(mark_scores.tolist(), space_scores.tolist())):
+        if index and index % PROGRESS_FRAMES == 0:
+            if progress is not None:
+                progress(index / frames.size)
+            if cancelled is not None and cancelled():
+                break
+        search.step(mark_score, space_score, dot, dash, element_gap, char_gap, word_gap, bigrams)
+    else:
+        if progress is not None:
+            progress(1.0)
+    text = search.finish(dot, dash)
+    if metrics is not None:
+        metrics.add_time('search', start)
+        metrics.count('symbols', len(text) - text.count(' '))
+        metrics.set('wpm', 1.2 * rate / unit)
+        metrics.publish()
+    return text
+
+
+def soft_decode_samples(audio_data, sample_rate, pitch=None, beam_width=BEAM_WIDTH, bigrams=None, bigram_weight=1.0,
+                        wpm=None, metrics=None, progress=None, cancelled=None):
+    # Decode a complete block of audio samples with the soft-decision decoder, like decode_samples().
+    if metrics is not None:
+        start = time.perf_counter()
+    detector = ToneDetector(sample_rate, pitch)
+    samples = to_mono(audio_data)
+    env = np.concatenate((detector.process(samples), detector.flush()))
+    if metrics is not None:
+        metrics.add_time('envelope', start)
+        metrics.count('samples', samples.size)
+    return soft_decode_envelope(env, detector.rate, beam_width, bigrams, bigram_weight, wpm, metrics, progress,
+                                cancelled)
+
+
+class _BeamSearch:
+    # Hypotheses of the beam, one entry per hypothesis in each array, and the decoded text they share.
+    # The text is a tree of emitted characters stored in chunks: every character points to the one
+    # before it, and a hypothesis only holds the index of its last character.
+    def __init__(self, beam_width, longest):
+        self.beam_width = beam_width
+        self.longest = longest
+        # Trie node, whether the current run is a mark, its length in frames, last character, text and score.
+        # The search starts in silence at the root of the trie, as if after a word break.
+        self.node = np.ones(1, dtype=np.int64)
+        self.mark = np.zeros(1, dtype=bool)
+        self.length = np.zeros(1, dtype=np.int64)
+        self.previous = np.full(1, SPACE, dtype=np.int64)
+        self.text = np.full(1, -1, dtype=np.int64)
+        self.score = np.zeros(1)
+        self.parents = []
+        self.symbols = []
+        self.symbol_count = 0
+
+    def step(self, mark_score, space_score, dot, dash, element_gap, char_gap, word_gap, bigrams):
+        # Advance every hypothesis by one frame and keep the best beam_width of the candidates.
+        node, mark, length, previous, score = self.node, self.mark, self.length, self.previous, self.score
+        emission = np.where(mark, mark_score, space_score)
+        # Every hypothesis can continue its run.
+        candidates = [(node, mark, np.minimum(length + 1, self.longest), previous, np.arange(node.size),
+                       score + emission, np.full(node.size, -1), np.zeros(node.size, dtype=bool))]
+        # A mark can end as a dot or a dash, moving down the trie when that leads to a code.
+        marks = np.flatnonzero(mark)
+        for bit, durations in ((0, dot), (1, dash)):
+            child = 2 * node[marks] + bit
+            valid = child < TRIE_SIZE
+            valid[valid] = PREFIX[child[valid]]
+            chosen = marks[valid]
+            candidates.append((child[valid], np.zeros(chosen.size, dtype=bool), np.ones(chosen.size, dtype=np.int64),
+                               previous[chosen], chosen, score[chosen] + durations[length[chosen]] + space_score,
+                               np.full(chosen.size, -1), np.zeros(chosen.size, dtype=bool)))
+        # A space can end as an element gap within a character, or complete the character as a character
+        # or word gap. The silence before the first mark, at the root of the trie, costs nothing.
+        spaces = np.flatnonzero(~mark)
+        at_root = node[spaces] == 1
+        start = spaces[at_root]
+        candidates.append(self._marks(start, node[start], previous[start], score[start] + mark_score))
+        within = spaces[~at_root]
+        candidates.append(self._marks(within, node[within], previous[within],
+                                      score[within] + element_gap[length[within]] + mark_score))
+        character = CHARACTER_INDEX[node[within]]
+        complete = within[character >= 0]
+        character = character[character >= 0]
+        gained = score[complete] + bigrams[previous[complete], character] + mark_score
+        candidates.append(self._marks(complete, np.ones_like(complete), character,
+                                      gained + char_gap[length[complete]], character))
+        candidates.append(self._marks(complete, np.ones_like(complete), np.full_like(complete, SPACE),
+                                      gained + word_gap[length[complete]] + bigrams[character, SPACE], character,
+                                      True))
+        node, mark, length, previous, origin, score, emitted, spaced = (np.concatenate(parts)
+                                                                        for parts in zip(*candidates))
+        # Candidates that only differ by their text are the same state: keep the best of each (Viterbi).
+        key = ((node * 2 + mark) * (self.longest + 1) + length) * len(VOCABULARY) + previous
+        order = np.lexsort((-score, key))
+        first = np.ones(order.size, dtype=bool)
+        first[1:] = key[order[1:]] != key[order[:-1]]
+        kept = order[first]
+        if kept.size > self.beam_width:
+            kept = kept[np.argpartition(-score[kept], self.beam_width - 1)[:self.beam_width]]
+        self.node, self.mark, self.length, self.previous = node[kept], mark[kept], length[kept], previous[kept]
+        self.score = score[kept] - score[kept].max()
+        self.text = self.text[origin[kept]]
+        self._emit(emitted[kept], spaced[kept])
+
+    def _marks(self, origin, node, previous, score, emitted=None, spaced=False):
+        # Candidates starting a new mark of one frame from the hypotheses at origin.
+        size = origin.size
+        return (node, np.ones(size, dtype=bool), np.ones(size, dtype=np.int64), previous, origin, score,
+                np.full(size, -1) if emitted is None else emitted, np.full(size, spaced))
+
+    def _emit(self, emitted, spaced):
+        # Add the characters completed by the surviving hypotheses, and their word breaks, to the text tree.
+        for mask, symbols in ((emitted >= 0, emitted), (spaced, None)):
+            chosen = np.flatnonzero(mask)
+            if chosen.size == 0:
+                continue
+            self.parents.append(self.text[chosen])
+            self.symbols.append(symbols[chosen] if symbols is not None else np.full(chosen.size, SPACE))
+            self.text[chosen] = self.symbol_count + np.arange(chosen.size)
+            self.symbol_count += chosen.size
+
+    def finish(self, dot, dash):
+        # End the last run of every hypothesis and return the text of the best one.
+        node, score = self.node.copy(), self.score.copy()
+        marks = np.flatnonzero(self.mark)
+        if marks.size:
+            # The final mark is a dot or a dash, whichever scores better and stays on a code path.
+            options = []
+            for bit, durations in ((0, dot), (1, dash)):
+                child = 2 * node[marks] + bit
+                valid = child < TRIE_SIZE
+                valid[valid] = PREFIX[child[valid]]
+                options.append((np.where(valid, child, 0), np.where(valid, durations[self.length[marks]], -np.inf)))
+            use_dash = options[1][1] > options[0][1]
+            node[marks] = np.where(use_dash, options[1][0], options[0][0])
+            score[marks] += np.where(use_dash, options[1][1], options[0][1])
+        best = int(np.argmax(score))
+        symbols = []
+        if node[best] > 1:
+            character = CHARACTER_INDEX[node[best]]
+            symbols.append(VOCABULARY[character] if character >= 0 else '?')
+        parents = np.concatenate(self.parents) if self.parents else np.zeros(0, dtype=np.int64)
+        emitted = np.concatenate(self.symbols) if self.symbols else np.zeros(0, dtype=np.int64)
+        index = int(self.text[best])
+        while index >= 0:
+            symbols.append(VOCABULARY[emitted[index]])
+            index = int(parents[index])
+        return ''.join(reversed(symbols)).strip()
@@ -0,0 +1,112 @@
+# String catalogs of the graphical front-end, one per language.
+# The application window looks every visible text up in the catalog chosen at startup, so the English and
+# Italian front-ends share all their code and only differ in the catalog they pass to the window.
+import os
+
+# Language used when none is chosen, and the environment variable that overrides the front-end's choice.
+DEFAULT_LANGUAGE = 'en'
+LANGUAGE_VARIABLE = 'MORSEWAVE_LANGUAGE'
+
+ENGLISH = {
+    'window_title': "Morse Wave Translator",
+    'record': "Record",
+    'decode': "Decode",
+    'open_file': "Open File",
+    'play': "Play",
+    'save': "Save",
+    'stop': "Stop",
+    'help': "Help",
+    'duration_placeholder': "Recording Duration (seconds)",
+    'input_device': "Input Device:",
+    'duration': "Recording Duration:",
+    'results': "Results:",
+    'invalid_duration': "Error: Enter a valid duration.",
+    'duration_not_positive': "Error: Duration must be greater than zero.",
+    'recorded': "Audio recorded for {seconds:g} seconds",
+    'recording_error': "Error during recording: {error}",
+    'recording_unknown_error': "Unknown error during recording: {error}",
+    'decoded': "Decoded Morse Code: ",
+    'no_audio': "No audio recorded.",
+    'stopped': " [stopped]",
+    'decoding_unknown_error': "Unknown error during decoding: {error}",
+    'open_title': "Open Audio File",
+    'audio_filter': "Audio Files (*.wav);;All Files (*)",
+    'decoded_file': "Decoded Morse Code from File: ",
+    'file_error': "Error while opening the audio file: {error}",
+    'file_unknown_error': "Unknown error while opening the audio file: {error}",
+    'playback_unknown_error': "Unknown error during playback of the audio file: {error}",
+    'no_audio_playback': "No audio recorded for playback.",
+    'save_title': "Save Audio File",
+    'saved': "Audio saved to {file_name}",
+    'save_error': "Error while saving the audio file: {error}",
+    'no_audio_save': "No audio recorded to save.",
+    'help_title': "Help",
+    'help_text': (
+        "This application allows you to record audio signals and decode them into Morse code. Here's how to use it:\n\n"
+        "1. **Select Input Device:** In the 'Input Device' dropdown menu, you can choose the audio input device you want to use for recording. Make sure your audio device is correctly configured.\n\n"
+        "2. **Recording:** In the 'Recording Duration (seconds)' field, enter the desired recording duration and press the 'Record' button. The app will record audio from the selected device for the specified period.\n\n"
+        "3. **Decoding:** After recording, press the 'Decode' button to decode the recorded Morse signal. The decoding result will be displayed in the 'Results' area.\n\n"
+        "4. **Opening Audio Files:** If you have an audio file with Morse signals, you can open it by pressing the 'Open File' button. The app will decode the content of the file and display it in the 'Results' area.\n\n"
+        "5. **Playback Recorded Audio:** After recording, by pressing the 'Play' button, you can listen to the recorded audio again.\n\n"
+        "Make sure you select the correct input device and set an appropriate recording duration. Have fun decoding Morse signals!\n\n"
+        "Author: Luca Bocaletto AKA Elektronoide\n\n"
+        "Website: https://www.elektronoide.it"),
+}
+
+# Italian catalog. The button names kept in English are those of the original Italian front-end.
+ITALIAN = {
+    **ENGLISH,
+    'open_file': "Apri File",
+    'save': "Salva",
+    'help': "Guida",
+    'duration_placeholder': "Durata della registrazione (secondi)",
+    'input_device': "Dispositivo di Input:",
+    'duration': "Durata della registrazione:",
+    'results': "Risultati:",
+    'invalid_duration': "Errore: Inserisci una durata valida.",
+    'duration_not_positive': "Errore: La durata deve essere maggiore di zero.",
+    'recorded': "Audio registrato per {seconds:g} secondi",
+    'recording_error': "Errore durante la registrazione: {error}",
+    'recording_unknown_error': "Errore sconosciuto durante la registrazione: {error}",
+    'no_audio': "Nessun audio registrato.",
+    'stopped': " [interrotto]",
+    'decoding_unknown_error': "Errore sconosciuto durante la decodifica: {error}",
+    'open_title': "Apri File Audio",
+    'audio_filter': "File Audio (*.wav);;Tutti i Files (*)",
+    'file_error': "Errore durante l'apertura del file audio: {error}",
+    'file_unknown_error': "Errore sconosciuto durante l'apertura del file audio: {error}",
+    'playback_unknown_error': "Errore sconosciuto durante la riproduzione del file audio: {error}",
+    'no_audio_playback': "Nessun audio registrato per la riproduzione.",
+    'save_title': "Salva File Audio",
+    'saved': "Audio salvato in {file_name}",
+    'save_error': "Errore durante il salvataggio del file audio: {error}",
+    'no_audio_save': "Nessun audio registrato da salvare.",
+    'help_title': "Guida",
+    'help_text': (
+        "Questa applicazione consente di registrare segnali audio e decodificarli in codice Morse. Ecco come utilizzarla:\n\n"
+        "1. **Selezione del Dispositivo di Input:** Nel menu a discesa 'Dispositivo di Input', puoi selezionare il dispositivo audio di input che desideri utilizzare per la registrazione. Assicurati che il tuo dispositivo audio sia correttamente configurato.\n\n"
+        "2. **Registrazione:** Nel campo 'Durata della registrazione (secondi)', inserisci la durata desiderata per la registrazione e premi il pulsante 'Record'. L'app registrerà l'audio dal dispositivo selezionato per il periodo specificato.\n\n"
+        "3. **Decodifica:** Dopo la registrazione, premi il pulsante 'Decode' per decodificare il segnale Morse registrato. Il risultato della decodifica verrà mostrato nell'area 'Risultati'.\n\n"
+        "4. **Apertura di File Audio:** Se hai un file audio con segnali Morse, puoi aprirlo premendo il pulsante 'Apri File'. L'app decodificherà il contenuto del file e lo mostrerà nell'area 'Risultati'.\n\n"
+        "5. **Riproduzione Audio Registrato:** Dopo la registrazione, premendo il pulsante 'Play', puoi ascoltare nuovamente l'audio registrato.\n\n"
+        "Assicurati di aver selezionato il dispositivo di input corretto e di impostare una durata di registrazione adeguata. Buon divertimento decodificando segnali Morse!\n\n"
+        "Autore: Bocaletto Luca Aka Elektronoide\n\n"
+        "Sito Web: https://www.elektronoide.it"),
+}
+
+# Catalogs by language code.
+CATALOGS = {'en': ENGLISH, 'it': ITALIAN}
+
+
+def select_language(default=DEFAULT_LANGUAGE):
+    # Return the language to start with: the one set in the MORSEWAVE_LANGUAGE environment variable,
+    # or the front-end's default when the variable is unset or names a language without a catalog.
+    language = os.environ.get(LANGUAGE_VARIABLE, '').strip().lower()
+    return language if language in CATALOGS else default
+
+
+def get_catalog(language):
+    # Return the string catalog of a language.
+    if language not in CATALOGS:
+        raise ValueError(f"No strings for language {language!r}; available: {', '.join(sorted(CATALOGS))}.")
+    return CATALOGS[language]
@@ -0,0 +1,155 @@
+# Morse audio synthesizer: turns text into CW audio assembled from cached element waveforms.
+import functools
+import re
+
+import numpy as np
+
+from .codes import ENCODE_TABLE
+from .timing import DEFAULT_WPM
+
+# Pitch of the synthesized tone in Hz.
+DEFAULT_PITCH = 700
+# Sample rate of the synthesized audio, the same as the recordings of the front-ends.
+DEFAULT_SAMPLE_RATE = 44100
+# Duration in seconds of the raised-cosine ramp at each end of a mark, which keeps the spectrum free of key clicks.
+RISE_TIME = 0.005
+# Peak amplitude of the tone.
+AMPLITUDE = 0.5
+# Number of (speed, pitch, sample rate) waveform sets kept before the least recently used is evicted.
+ELEMENT_CACHE_SIZE = 16
+# Number of frames produced at a time when streaming audio to a file (about 1.5 seconds at 44.1 kHz).
+SYNTH_BLOCK_SIZE = 65536
+
+# Text is split into prosigns such as "<SK>", runs of whitespace, and single characters.
+_TOKEN_PATTERN = re.compile(r'<[^<>\s]+>|\s+|.', re.DOTALL)
+
+
+class ElementWaveforms:
+    # Waveforms of the dot, the dash and the gaps for one speed, pitch and sample rate.
+    # Characters are assembled from the elements the first time they are needed and kept,
+    # so that the audio of a text is a concatenation of precomputed arrays.
+    # Every array is read-only, as it is shared by all the texts encoded with these settings.
+    def __init__(self, wpm, pitch, sample_rate, rise_time=RISE_TIME):
+        self.wpm = wpm
+        self.pitch = pitch
+        self.sample_rate = sample_rate
+        # Length of a dot in samples, from the PARIS standard of 50 dot lengths per word.
+        self.unit = max(1, int(round(sample_rate * 1.2 / wpm)))
+        # Samples of each raised-cosine ramp. The ramps are centred on the nominal edges of a mark: every
+        # mark starts half a ramp early and ends half a ramp late, taking a ramp from the gaps on either
+        # side, so that its 50% amplitude points fall on the unit boundaries.
+        self.ramp = min(int(sample_rate * rise_time), self.unit)
+        self.dot = self._mark(self.unit + self.ramp)
+        self.dash = self._mark(3 * self.unit + self.ramp)
+        # Element, character and word gaps are views of one block of silence.
+        silence = np.zeros(7 * self.unit - self.ramp, dtype=np.float32)
+        silence.setflags(write=False)
+        self.element_gap = silence[:self.unit - self.ramp]
+        self.char_gap = silence[:3 * self.unit - self.ramp]
+        self.word_gap = silence
+        self.characters = {}
+
+    def _mark(self, length):
+        # Return a tone burst of the given length, shaped with raised-cosine ramps at both ends.
+        t = np.arange(length) / self.sample_rate
+        tone = AMPLITUDE * np.sin(2 * np.pi * self.pitch * t)
+        if self.ramp:
+            ramp = 0.5 - 0.5 * np.cos(np.pi * (np.arange(self.ramp) + 0.5) / self.ramp)
+            tone[:self.ramp] *= ramp
+            tone[length - self.ramp:] *= ramp[::-1]
+        mark = tone.astype(np.float32)
+        mark.setflags(write=False)
+        return mark
+
+    def character(self, symbol):
+        # Return the waveform of a character or prosign, without the gap that follows it.
+        waveform = self.characters.get(symbol)
+        if waveform is None:
+            code = ENCODE_TABLE.get(symbol)
+            if code is None:
+                raise ValueError(f"Cannot encode {symbol!r} in Morse code.")
+            pieces = []
+            for element in code:
+                if pieces:
+                    pieces.append(self.element_gap)
+                pieces.append(self.dash if element == '-' else self.dot)
+            waveform = np.concatenate(pieces)
+            waveform.setflags(write=False)
+            self.characters[symbol] = waveform
+        return waveform
+
+    def pieces(self, text):
+        # Yield the waveforms and gaps that make up the audio of a text, in order.
+        gap = None
+        for symbol in tokenize(text):
+            if symbol == ' ':
+                gap = self.word_gap
+                continue
+            if gap is not None:
+                yield gap
+            yield self.character(symbol)
+            gap = self.char_gap
+
+
+def tokenize(text):
+    # Split a text into the characters and prosigns to send, with ' ' for each word break.
+    # Letters are upper-cased, and any run of whitespace between words is one word break.
+    pending_space = False
+    started = False
+    for token in _TOKEN_PATTERN.findall(text.upper()):
+        if token.isspace():
+            pending_space = started
+            continue
+        if pending_space:
+            yield ' '
+            pending_space = False
+        yield token
+        started = True
+
+
+@functools.lru_cache(maxsize=ELEMENT_CACHE_SIZE)
+def element_waveforms(wpm=DEFAULT_WPM, pitch=DEFAULT_PITCH, sample_rate=DEFAULT_SAMPLE_RATE, rise_time=RISE_TIME):
+    # Return the element waveforms for a set of parameters, computed once and kept in an LRU cache.
+    return ElementWaveforms(wpm, pitch, sample_rate, rise_time)
+
+
+def encode_to_audio(text, wpm=DEFAULT_WPM, pitch=DEFAULT_PITCH, sample_rate=DEFAULT_SAMPLE_RATE, rise_time=RISE_TIME):
+    # Return the CW audio of a text as one float32 array, built with a single concatenation.
+    pieces = list(element_waveforms(wpm, pitch, sample_rate, rise_time).pieces(text))
+    if not pieces:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(pieces)
+
+
+def iter_encode(text, wpm=DEFAULT_WPM, pitch=DEFAULT_PITCH, sample_rate=DEFAULT_SAMPLE_RATE,
+                rise_time=RISE_TIME, block_size=SYNTH_BLOCK_SIZE):
+    # Yield the CW audio of a text in blocks of block_size frames, the last one possibly shorter.
+    # The blocks are filled in one reusable buffer, so each block is only valid until the next one
+    # is requested, and memory does not depend on the length of the text.
+    buffer = np.empty(block_size, dtype=np.float32)
+    filled = 0
+    for piece in element_waveforms(wpm, pitch, sample_rate, rise_time).pieces(text):
+        start = 0
+        while start < piece.size:
+            count = min(piece.size - start, block_size - filled)
+            buffer[filled:filled + count] = piece[start:start + count]
+            filled += count
+            start += count
+            if filled == block_size:
+                yield buffer
+                filled = 0
+    if filled:
+        yield buffer[:filled]
+
+
+def encode_to_file(filename, text, wpm=DEFAULT_WPM, pitch=DEFAULT_PITCH, sample_rate=DEFAULT_SAMPLE_RATE,
+                   rise_time=RISE_TIME, block_size=SYNTH_BLOCK_SIZE):
+    # Write the CW audio of a text to an audio file block by block and return the number of frames written.
+    # soundfile is imported here so that the decoder engine can be used without it.
+    import soundfile as sf
+    frames = 0
+    with sf.SoundFile(filename, 'w', samplerate=sample_rate, channels=1) as sound_file:
+        for block in iter_encode(text, wpm, pitch, sample_rate, rise_time, block_size):
+            sound_file.write(block)
+            frames += block.size
+    return frames
@@ -0,0 +1,117 @@
+# Online timing model: follows the dot length and the sending speed from the lengths of marks and spaces.
+import math
+
+import numpy as np
+
+# Sending speed assumed before any mark has been measured.
+DEFAULT_WPM = 20
+# Smallest weight of a new run in the centroid it is assigned to; the first runs of a cluster
+# weigh more, so that the centroid starts at their mean.
+ADAPTATION = 0.15
+# Weight with which the other centroids follow, to keep the 1:3 and 1:3:7 ratios of Morse timing.
+COUPLING = 0.05
+# Log ratios of a dash to a dot, and of the character and word gaps to the element gap.
+LOG3 = math.log(3)
+LOG7 = math.log(7)
+# A mark between these ratios of the nearest outer centroid shows that the clusters are mislabelled.
+RELABEL_RATIOS = (math.log(2), math.log(4.5))
+
+
+class TimingModel:
+    # Online k-means clustering of mark lengths into dots and dashes, and of space lengths into
+    # element, character and word gaps. Every run updates one centroid in O(1) time, on a log scale
+    # so that the clusters keep the same relative width at 12 WPM and at 35 WPM.
+    # A fixed model keeps the nominal timing of its initial speed and ignores the runs it is given,
+    # for signals whose speed is known.
+    def __init__(self, rate, unit=None, wpm=DEFAULT_WPM, fixed=False):
+        # Rate of the envelope the lengths are measured in, in values per second.
+        self.rate = rate
+        self.fixed = fixed
+        self.reset(unit if unit else rate * 1.2 / wpm)
+
+    def reset(self, unit):
+        # Place every centroid at its nominal length for a dot length, as logarithms.
+        log_unit = math.log(unit)
+        self.marks = [log_unit, log_unit + LOG3]
+        self.spaces = [log_unit, log_unit + LOG3, log_unit + LOG7]
+        # Number of runs assigned to each centroid since the last reset.
+        self.mark_counts = [0, 0]
+        self.space_counts = [0, 0, 0]
+
+    @property
+    def unit(self):
+        # Dot length in envelope values, measured from both the dots and the dashes.
+        return math.exp((self.marks[0] + self.marks[1] - LOG3) / 2)
+
+    @property
+    def wpm(self):
+        # Sending speed in words per minute; a dot lasts 1.2 / WPM seconds.
+        return 1.2 * self.rate / self.unit
+
+    def dash_limit(self):
+        # Marks at least this long are dashes.
+        return math.exp((self.marks[0] + self.marks[1]) / 2)
+
+    def char_gap_limit(self):
+        # Spaces at least this long end a character.
+        return math.exp((self.spaces[0] + self.spaces[1]) / 2)
+
+    def word_gap_limit(self):
+        # Spaces at least this long end a word.
+        return math.exp((self.spaces[1] + self.spaces[2]) / 2)
+
+    def add_mark(self, length):
+        # Assign a mark to the dot or dash cluster and move that centroid towards it.
+        if self.fixed:
+            return
+        value = math.log(max(length, 1))
+        dot, dash = self.marks
+        # A mark about three times the dashes means that the dashes were dots, and a mark about
+        # a third of the dots means that the dots were dashes: start again from the new speed.
+        if RELABEL_RATIOS[0] < value - dash < RELABEL_RATIOS[1]:
+            self.reset(math.exp(dash))
+        elif RELABEL_RATIOS[0] < dot - value < RELABEL_RATIOS[1]:
+            self.reset(length)
+        elif value - dash >= RELABEL_RATIOS[1] or dot - value >= RELABEL_RATIOS[1]:
+            # Much longer or shorter marks are tuning carriers or noise and do not move the clusters.
+            return
+        self._update(self.marks, self.mark_counts, value, (0, LOG3))
+        # Until the first space has been measured, the gaps follow the dot length.
+        if not any(self.space_counts):
+            log_unit = math.log(self.unit)
+            self.spaces = [log_unit, log_unit + LOG3, log_unit + LOG7]
+
+    def add_space(self, length):
+        # Assign a space to the element, character or word gap cluster and move that centroid towards it.
+        if self.fixed:
+            return
+        value = math.log(max(length, 1))
+        # Pauses much longer than a word gap do not move the clusters, and neither do dropouts
+        # much shorter than a dot, which would otherwise pull the element gap below the dots.
+        if value - self.spaces[2] >= RELABEL_RATIOS[0] or self.marks[0] - value >= RELABEL_RATIOS[0]:
+            return
+        self._update(self.spaces, self.space_counts, value, (0, LOG3, LOG7))
+
+    def track(self, states, lengths):
+        # Feed a sequence of runs and return, for each run, the dash, character gap and word gap
+        # limits in force once that run has been added.
+        limits = np.empty((len(states), 3))
+        for index, (state, length) in enumerate(zip(states.tolist(), lengths.tolist())):
+            if state:
+                self.add_mark(length)
+            else:
+                self.add_space(length)
+            limits[index] = self.dash_limit(), self.char_gap_limit(), self.word_gap_limit()
+        return limits
+
+    def _update(self, centroids, counts, value, offsets):
+        # Move the nearest centroid towards the value, and the others along with it at a lower weight.
+        # Centroids that have not been assigned a run yet stay at their nominal ratio to the updated one.
+        nearest = min(range(len(centroids)), key=lambda index: abs(value - centroids[index]))
+        counts[nearest] += 1
+        centroids[nearest] += max(ADAPTATION, 1.0 / counts[nearest]) * (value - centroids[nearest])
+        base = centroids[nearest] - offsets[nearest]
+        for index in range(len(centroids)):
+            if index != nearest:
+                weight = COUPLING if counts[index] else 1.0
+                centroids[index] += weight * (base + offsets[index] - centroids[index])
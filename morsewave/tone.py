@@ -0,0 +1,113 @@
+# Tone detection front-end: tracks the energy of a CW carrier at its pitch and decimates the envelope.
+# Everything after this stage works at ENVELOPE_RATE instead of the audio sample rate.
+import numpy as np
+
+# Rate in Hz of the envelope produced by the tone detector.
+ENVELOPE_RATE = 1000
+# Length in seconds of the sliding DFT window; it sets a bandwidth of about 1 / TONE_WINDOW Hz.
+TONE_WINDOW = 0.008
+# Seconds of audio searched for the pitch of the carrier.
+PITCH_SEARCH_SECONDS = 2.0
+# Range of pitches in Hz searched for a CW carrier.
+MIN_PITCH = 150.0
+MAX_PITCH = 3000.0
+# Minimum ratio between the spectral peak and the median of the searched band for a tone to be found.
+MIN_PEAK_RATIO = 10.0
+
+
+def find_pitch(samples, sample_rate, min_pitch=MIN_PITCH, max_pitch=MAX_PITCH):
+    # Return the frequency of the strongest tone in the samples, or None when there is no clear tone.
+    if samples.size < 2:
+        return None
+    spectrum = np.abs(np.fft.rfft(samples * np.hanning(samples.size)))
+    frequencies = np.fft.rfftfreq(samples.size, 1.0 / sample_rate)
+    band = np.flatnonzero((frequencies >= min_pitch) & (frequencies <= max_pitch))
+    if band.size < 3:
+        return None
+    peak = band[np.argmax(spectrum[band])]
+    if spectrum[peak] < MIN_PEAK_RATIO * np.median(spectrum[band]):
+        return None
+    # Refine the peak between bins with a parabola through the peak and its neighbours.
+    offset = 0.0
+    if 0 < peak < spectrum.size - 1:
+        low, centre, high = spectrum[peak - 1:peak + 2]
+        curvature = low - 2 * centre + high
+        if curvature:
+            offset = 0.5 * (low - high) / curvature
+    return float(frequencies[peak] + offset * frequencies[1])
+
+
+class ToneDetector:
+    # Block-wise Goertzel filter feeding a sliding DFT at the pitch of the carrier.
+    # Every hop of samples is reduced to one complex partial sum with a single matrix product,
+    # the partial sums are summed over a sliding window, and the magnitude is the decimated envelope.
+    # When no pitch is given, it is found from an FFT peak over the first seconds of audio.
+    def __init__(self, sample_rate, pitch=None, envelope_rate=ENVELOPE_RATE, window=TONE_WINDOW):
+        self.sample_rate = sample_rate
+        # Number of samples reduced to each envelope value, and the resulting envelope rate.
+        self.hop = max(1, int(round(sample_rate / envelope_rate)))
+        self.rate = sample_rate / self.hop
+        # Number of partial sums in the sliding window.
+        self.span = max(1, int(round(window * self.rate)))
+        self.search_size = int(sample_rate * PITCH_SEARCH_SECONDS)
+        # Samples not processed yet: less than one hop, or the audio searched for the pitch.
+        self.pending = np.zeros(0, dtype=np.float32)
+        # Partial sums from the end of the previous block, still inside the sliding window.
+        self.history = np.zeros(0, dtype=np.complex128)
+        # Phase of the reference oscillator at the first pending sample.
+        self.phase = 0.0
+        self.pitch = None
+        if pitch:
+            self.set_pitch(pitch)
+
+    def set_pitch(self, pitch):
+        # Tune the detector to a pitch in Hz.
+        self.pitch = pitch
+        omega = 2 * np.pi * pitch / self.sample_rate
+        self.kernel = np.exp(-1j * omega * np.arange(self.hop)).astype(np.complex64)
+        self.hop_phase = omega * self.hop
+
+    def process(self, samples):
+        # Return the envelope values completed by a block of samples.
+        samples = np.concatenate((self.pending, np.asarray(samples, dtype=np.float32)))
+        if self.pitch is None:
+            if samples.size < self.search_size:
+                self.pending = samples
+                return np.zeros(0, dtype=np.float32)
+            return self._search(samples)
+        return self._detect(samples)
+
+    def flush(self):
+        # Return the envelope of the samples still pending at the end of the audio.
+        samples, self.pending = self.pending, np.zeros(0, dtype=np.float32)
+        if self.pitch is None:
+            return self._search(samples)
+        return self._detect(samples)
+
+    def _search(self, samples):
+        # Look for the pitch in the buffered audio; without a tone, the audio is reported as silence.
+        pitch = find_pitch(samples[:self.search_size], self.sample_rate)
+        if pitch is not None:
+            self.set_pitch(pitch)
+            return self._detect(samples)
+        frames = samples.size // self.hop
+        self.pending = samples[frames * self.hop:]
+        return np.zeros(frames, dtype=np.float32)
+
+    def _detect(self, samples):
+        # Reduce every complete hop to a partial DFT sum at the pitch.
+        frames = samples.size // self.hop
+        self.pending = samples[frames * self.hop:]
+        partial = samples[:frames * self.hop].reshape(frames, self.hop) @ self.kernel
+        # Rotate the partial sums to the phase of a continuous reference oscillator.
+        partial = partial * np.exp(-1j * (self.phase + self.hop_phase * np.arange(frames)))
+        self.phase = (self.phase + self.hop_phase * frames) % (2 * np.pi)
+        # Sum the partial sums over the sliding window.
+        joined = np.concatenate((self.history, partial))
+        cumulative = np.concatenate(([0], np.cumsum(joined)))
+        ends = np.arange(self.history.size + 1, joined.size + 1)
+        starts = np.maximum(ends - self.span, 0)
+        sums = cumulative[ends] - cumulative[starts]
+        self.history = joined[joined.size - (self.span - 1):] if self.span > 1 else joined[:0]
+        # Scale the magnitude to the amplitude of the carrier.
+        return (np.abs(sums) * (2.0 / (self.span * self.hop))).astype(np.float32)
@@ -0,0 +1,65 @@
+# Background execution of recording and decoding jobs for the Qt front-ends.
+# Jobs run on a QThreadPool and report partial text, progress and their outcome through Qt signals,
+# which are delivered on the GUI thread, so the event loop is never blocked by audio work.
+# This module needs PyQt5 and is only imported by the graphical front-ends, never by the engine.
+import threading
+
+from PyQt5 import QtCore
+
+
+class WorkerSignals(QtCore.QObject):
+    # Signals of a Worker. A QRunnable is not a QObject, so the signals live in this companion object.
+    # Decoded text produced so far, one piece at a time.
+    text = QtCore.pyqtSignal(str)
+    # Progress of the job in percent.
+    progress = QtCore.pyqtSignal(int)
+    # Return value of the job, emitted when it ends normally or is cancelled.
+    finished = QtCore.pyqtSignal(object)
+    # Exception raised by the job.
+    failed = QtCore.pyqtSignal(object)
+
+
+class Worker(QtCore.QRunnable):
+    # Runs function(*args, on_text=..., on_progress=..., cancelled=...) on a thread pool thread.
+    # The function passes decoded text to on_text, the completed fraction to on_progress,
+    # and calls cancelled() between blocks of work to stop early once cancel() has been called.
+    def __init__(self, function, *args):
+        super().__init__()
+        self.function = function
+        self.args = args
+        self.signals = WorkerSignals()
+        self.cancel_event = threading.Event()
+        # Whether the job has seen cancelled() return true, and so ended before finishing its work.
+        self.stopped = False
+        self.percent = -1
+        # The pool must not delete the runnable while the GUI still holds it to cancel it.
+        self.setAutoDelete(False)
+
+    def cancel(self):
+        # Ask the job to stop at its next check; safe to call from any thread.
+        self.cancel_event.set()
+
+    def cancelled(self):
+        # Return whether the job has been asked to stop; called by the job, which stops when it is true.
+        if self.cancel_event.is_set():
+            self.stopped = True
+        return self.stopped
+
+    def report_progress(self, fraction):
+        # Emit the progress only when the whole percentage changes, so that fast jobs
+        # do not flood the event loop with signals.
+        percent = int(fraction * 100)
+        if percent != self.percent:
+            self.percent = percent
+            self.signals.progress.emit(percent)
+
+    def run(self):
+        # Run the job on the pool thread and report its outcome.
+        try:
+            result = self.function(*self.args, on_text=self.signals.text.emit, on_progress=self.report_progress,
+                                   cancelled=self.cancelled)
+        except Exception as e:
+            self.signals.failed.emit(e)
+        else:
+            self.signals.finished.emit(result)
+